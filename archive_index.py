@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import re
+import sys
+from publish import write_json_if_changed
+from archive_store import get_store
+
+ARCHIVE_DIR = "public/archive"
+INDEX_FILE = os.path.join(ARCHIVE_DIR, "index.json")
+# 每日存档的元数据（条数、字节数、内容哈希、修改时间），index.json 由它派生
+# 放在 archive 目录外，避免被当成日存档文件遍历
+META_FILE = "public/archive_meta.json"
+
+DAY_FILE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})\.json$")
+
+def list_archive_dates(archive_dir=ARCHIVE_DIR):
+    """列出存档目录下所有日存档的日期（升序）"""
+    if not os.path.exists(archive_dir):
+        return []
+    dates = []
+    for filename in os.listdir(archive_dir):
+        match = DAY_FILE_PATTERN.match(filename)
+        if match:
+            dates.append(match.group(1))
+    return sorted(dates)
+
+def describe_day_file(file_path, count=None, store=None):
+    """
+    计算日存档的元数据：按块计算哈希，不整体载入文件；
+    已知条数时不再解析，否则由存档存储逐条统计（jsonl 模式下逐行读取日志）。
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    if count is None:
+        date_str = os.path.basename(file_path)[:-len(".json")]
+        count = (store or get_store(os.path.dirname(file_path))).count_items(date_str)
+    return {
+        "count": count,
+        "bytes": os.path.getsize(file_path),
+        "sha256": digest.hexdigest(),
+        "mtime": int(os.path.getmtime(file_path)),
+    }
+
+def load_meta(meta_path=META_FILE):
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ 读取 {meta_path} 失败: {e}")
+        return None
+
+def write_index(meta, archive_dir=ARCHIVE_DIR, meta_path=META_FILE):
+    """写出元数据和前端使用的 index.json（{date: count}），返回 index.json 路径"""
+    meta = dict(sorted(meta.items()))
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    index_path = os.path.join(archive_dir, "index.json")
+    archive_index = {date_str: info["count"] for date_str, info in meta.items()}
+    write_json_if_changed(index_path, archive_index)
+    return index_path
+
+def update_index(touched, archive_dir=ARCHIVE_DIR, meta_path=META_FILE, stamps=None):
+    """
+    增量更新索引：只重新计算本次写过的日存档。
+    touched: {date: 条数}。元数据不存在时退化为全量重建。
+    stamps: {date: {变换名: 指纹}}，记录该日存档已按哪版规则执行过哪些变换（见 archive_pipeline），
+    与原有记录合并。
+    """
+    meta = load_meta(meta_path)
+    if meta is None:
+        print("未找到归档元数据，执行全量重建...")
+        return rebuild_index(archive_dir, meta_path, stamps=stamps)
+
+    stamps = stamps or {}
+    for date_str, count in touched.items():
+        file_path = os.path.join(archive_dir, f"{date_str}.json")
+        if os.path.exists(file_path):
+            transforms = {**meta.get(date_str, {}).get("transforms", {}), **stamps.get(date_str, {})}
+            meta[date_str] = describe_day_file(file_path, count)
+            if transforms:
+                meta[date_str]["transforms"] = transforms
+        else:
+            meta.pop(date_str, None)
+    print(f"归档索引增量更新：{len(touched)} 天，共 {len(meta)} 天")
+    return write_index(meta, archive_dir, meta_path)
+
+def rebuild_index(archive_dir=ARCHIVE_DIR, meta_path=META_FILE, verify_only=False, stamps=None):
+    """
+    全量校验/重建：逐个扫描日存档，与已有元数据比对并报告差异。
+    verify_only=True 时只报告不写入，返回差异数；否则修复并返回 index.json 路径。
+    变换指纹沿用已有元数据，并合并 stamps 中给出的值。
+    """
+    old_meta = load_meta(meta_path) or {}
+    stamps = stamps or {}
+    store = get_store(archive_dir)
+    meta = {}
+    problems = 0
+    for date_str in list_archive_dates(archive_dir):
+        file_path = os.path.join(archive_dir, f"{date_str}.json")
+        try:
+            info = describe_day_file(file_path, store=store)
+        except Exception as e:
+            print(f"读取 {date_str}.json 失败: {e}")
+            problems += 1
+            continue
+        meta[date_str] = info
+        old = old_meta.get(date_str)
+        transforms = {**(old or {}).get("transforms", {}), **stamps.get(date_str, {})}
+        if transforms:
+            info["transforms"] = transforms
+        if old is None:
+            print(f"  [缺失] {date_str}: 索引中没有记录")
+            problems += 1
+        elif old.get("sha256") != info["sha256"] or old.get("count") != info["count"]:
+            print(f"  [过期] {date_str}: 索引 {old.get('count')} 条，实际 {info['count']} 条")
+            problems += 1
+
+    for date_str in sorted(set(old_meta) - set(meta)):
+        print(f"  [多余] {date_str}: 存档文件已不存在")
+        problems += 1
+
+    print(f"归档索引校验完成：{len(meta)} 天，发现 {problems} 处不一致")
+    if verify_only:
+        return problems
+    return write_index(meta, archive_dir, meta_path)
+
+if __name__ == "__main__":
+    # python archive_index.py           全量重建并修复
+    # python archive_index.py --verify  只校验，不一致时返回非零退出码
+    if "--verify" in sys.argv:
+        sys.exit(1 if rebuild_index(verify_only=True) else 0)
+    rebuild_index()
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from archive_index import ARCHIVE_DIR, list_archive_dates, load_meta, update_index
+from archive_store import get_store
+from homepage import write_homepage
+from news_core import get_item_title_key
+from search_index import has_search_index, update_search_index
+from metrics import get_metrics, record_run
+
+# 并行处理日存档的进程数
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", str(os.cpu_count() or 1)))
+
+# 各脚本注册的存档变换（按 order 依次执行）
+#   per_item=True:  func(item) -> item 或 None（删除该条）
+#   per_item=False: func(items) -> items，整日处理（如批量翻译）
+#   fingerprint:    变换规则的指纹，记入 archive_meta.json，未变化的日存档下次跳过
+#   default:        不指定 --only 时是否执行
+#   parallel:       能否在子进程中运行（依赖进程内共享状态的变换只能单进程执行）
+Transform = namedtuple("Transform", "name func fingerprint order per_item default parallel")
+TRANSFORMS = {}
+
+# 各脚本注册变换的模块，完整流水线运行前依次导入
+TRANSFORM_MODULES = ["maintenance", "fix_logos", "clean_stock_garbage", "migrate_tc"]
+
+def fingerprint(*parts):
+    """把规则数据（关键词表、映射表、版本号等）哈希成短指纹"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+def register_transform(name, fingerprint, order, per_item=True, default=True, parallel=True):
+    """装饰器：把函数注册为存档变换"""
+    def decorator(func):
+        TRANSFORMS[name] = Transform(name, func, fingerprint, order, per_item, default, parallel)
+        return func
+    return decorator
+
+def load_transform_modules():
+    for module in TRANSFORM_MODULES:
+        __import__(module)
+
+def select_transforms(names=None):
+    if names:
+        unknown = [name for name in names if name not in TRANSFORMS]
+        if unknown:
+            raise ValueError(f"未注册的变换: {', '.join(unknown)}（可用: {', '.join(TRANSFORMS)}）")
+        selected = [TRANSFORMS[name] for name in names]
+    else:
+        selected = [t for t in TRANSFORMS.values() if t.default]
+    return sorted(selected, key=lambda t: t.order)
+
+def apply_transforms(date_str, transforms, dry_run=False, archive_dir=ARCHIVE_DIR):
+    """
+    逐条读取一个日存档，依次执行各变换，内容变化时写回（dry_run 时不写）。
+    返回 (条数, {变换名: [删除数, 修改数]}, 删除的标题列表, 是否写入, 检索索引变更)
+    检索索引变更为 (变换前条目, 变换后条目)，未写入时为 None
+    """
+    store = get_store(archive_dir)
+    items = store.iter_day(date_str)
+    original = {}  # id -> 变换前的副本，用于找出被修改/删除的条目
+
+    stats = {}
+    removed_titles = []
+    for transform in transforms:
+        if transform.per_item:
+            result = []
+            removed = modified = 0
+            for item in items:
+                snapshot = dict(item)
+                original.setdefault(id(item), (item, snapshot))
+                new_item = transform.func(item)
+                if new_item is None:
+                    removed += 1
+                    removed_titles.append((transform.name, item.get('title_ja') or item.get('title')))
+                else:
+                    modified += new_item != snapshot
+                    result.append(new_item)
+        else:
+            items = list(items)
+            for item in items:
+                original.setdefault(id(item), (item, dict(item)))
+            snapshots = {id(item): dict(item) for item in items}
+            result = transform.func(items)
+            kept = {id(item) for item in result}
+            removed_list = [item for item in items if id(item) not in kept]
+            removed_titles.extend((transform.name, item.get('title_ja') or item.get('title'))
+                                  for item in removed_list)
+            removed = len(removed_list)
+            modified = sum(1 for item in result if id(item) in snapshots and item != snapshots[id(item)])
+        stats[transform.name] = [removed, modified]
+        items = result
+
+    written = False
+    search_change = None
+    if not dry_run and any(removed or modified for removed, modified in stats.values()):
+        kept = {id(item) for item in items}
+        upserts = [item for item in items if id(item) not in original or item != original[id(item)][1]]
+        deletes = [get_item_title_key(before) for item_id, (_, before) in original.items() if item_id not in kept]
+        written, _ = store.save_day(date_str, items, upserts, deletes)
+        store.flush_views()
+        if written:
+            before = [snapshot for _, snapshot in original.values()]
+            search_change = (before, items)
+    return len(items), stats, removed_titles, written, search_change
+
+def run_pipeline(names=None, dry_run=False, force=False, workers=PIPELINE_WORKERS, archive_dir=ARCHIVE_DIR):
+    """
+    单次遍历存档：每个日存档只读一次，执行全部选中的变换，内容变化时才写回。
+    已按当前指纹处理过的日存档直接跳过（force=True 时全部处理），多进程并行。
+    返回 {变换名: [删除数, 修改数]}
+    """
+    transforms = select_transforms(names)
+    mode = "（演练，不写入）" if dry_run else ""
+    print(f"=== 存档变换流水线{mode}: {' -> '.join(t.name for t in transforms)} ===")
+
+    metrics = get_metrics()
+    metrics.begin("scan")
+    meta = load_meta() or {}
+    dates = list_archive_dates(archive_dir)
+
+    def is_current(date_str):
+        stamps = meta.get(date_str, {}).get("transforms", {})
+        return all(stamps.get(t.name) == t.fingerprint for t in transforms)
+
+    pending = [d for d in dates if force or not is_current(d)]
+    print(f"共 {len(dates)} 个日存档，已是最新 {len(dates) - len(pending)} 个，需处理 {len(pending)} 个")
+    totals = {t.name: [0, 0] for t in transforms}
+    metrics.count("days", len(dates), stage="scan")
+    metrics.count("pending", len(pending), stage="scan")
+    if not pending:
+        metrics.end()
+        return totals
+
+    metrics.begin("transform")
+    if not all(t.parallel for t in transforms):
+        workers = 1
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            n = len(pending)
+            results = list(pool.map(apply_transforms, pending, [transforms] * n, [dry_run] * n, [archive_dir] * n))
+    else:
+        results = [apply_transforms(d, transforms, dry_run, archive_dir) for d in pending]
+
+    touched = {}
+    search_changes = {}
+    any_written = False
+    for date_str, (count, stats, removed_titles, written, search_change) in zip(pending, results):
+        for name, title in removed_titles:
+            print(f"  [{name}] 删除: {title}")
+        changes = []
+        for name, (removed, modified) in stats.items():
+            totals[name][0] += removed
+            totals[name][1] += modified
+            if removed or modified:
+                changes.append(f"{name} 删除 {removed} 修改 {modified}")
+        if changes:
+            print(f"{'将处理' if dry_run else '已处理'} {date_str}.json: {'，'.join(changes)}")
+        touched[date_str] = count
+        any_written = any_written or written
+        if search_change:
+            search_changes[date_str] = search_change
+
+    print(f"\n=== 流水线完成{mode} ===")
+    for name, (removed, modified) in totals.items():
+        print(f"  {name}: 删除 {removed} 条，修改 {modified} 条")
+        metrics.count(f"{name}_removed", removed, stage="transform")
+        metrics.count(f"{name}_modified", modified, stage="transform")
+    metrics.count("days_written", sum(1 for r in results if r[3]), stage="transform")
+    if dry_run:
+        metrics.end()
+        return totals
+
+    # 记上各变换的指纹，下次直接跳过
+    metrics.begin("index")
+    stamps = {t.name: t.fingerprint for t in transforms}
+    update_index(touched, archive_dir, stamps={d: stamps for d in touched})
+
+    if any_written:
+        print("\n正在重建首页 data.json ...")
+        metrics.begin("homepage")
+        homepage_news, _ = write_homepage(archive_dir)
+        print(f"首页数据重建完成，包含 {len(homepage_news)} 条新闻。")
+        # 只改标题字段以外的变换不会产生检索分片变更；本地还没有索引时留给 main.py 首次运行时重建
+        if has_search_index():
+            metrics.begin("search")
+            update_search_index(search_changes)
+    metrics.end()
+    return totals
+
+def main(argv):
+    # python archive_pipeline.py                  执行全部默认变换
+    # python archive_pipeline.py --only a,b       只执行指定变换
+    # python archive_pipeline.py --list           列出已注册的变换
+    # 另支持 --dry-run（只报告）、--force（忽略指纹全部处理）
+    load_transform_modules()
+    if "--list" in argv:
+        for t in sorted(TRANSFORMS.values(), key=lambda t: t.order):
+            flags = ("" if t.default else "，需 --only 指定") + ("" if t.parallel else "，单进程")
+            print(f"  {t.name:<16} 指纹 {t.fingerprint}{flags}")
+        return
+    names = None
+    if "--only" in argv:
+        names = argv[argv.index("--only") + 1].split(",")
+    with record_run("archive_pipeline"):
+        run_pipeline(names, dry_run="--dry-run" in argv, force="--force" in argv)
+
+if __name__ == "__main__":
+    # 以模块方式导入自身，保证各脚本注册到同一个 TRANSFORMS
+    import archive_pipeline
+    archive_pipeline.main(sys.argv[1:])
@@ -0,0 +1,401 @@
+import json
+import os
+import sqlite3
+import sys
+from common import write_atomic
+from news_core import get_item_title_key
+from publish import dump_json, write_json_if_changed
+
+# 日存档的存储方式：
+#   json   每次整日重写 public/archive/<date>.json（默认，兼容原有流程）
+#   jsonl  以追加写的日志 archive_journal/<date>.jsonl 为准，新增/更新一条只追加一行；
+#          public/archive/<date>.json 是由日志折叠出的排序视图，供前端使用，
+#          每次运行结束时（flush_views）每个改动过的日期只写一次
+#   sqlite 以 archive.db 为准（链接、标题键、时间、分类、来源均有索引），
+#          public/archive/*.json、index.json、data.json 都是由它导出的静态视图
+ARCHIVE_STORE = os.environ.get("ARCHIVE_STORE", "json")
+ARCHIVE_DIR = "public/archive"
+JOURNAL_DIR = os.environ.get("ARCHIVE_JOURNAL_DIR", "archive_journal")
+ARCHIVE_DB = os.environ.get("ARCHIVE_DB", "archive.db")
+# 日志行数超过有效条目数的这个倍数时重写日志，丢掉被覆盖/删除的旧记录
+COMPACT_RATIO = float(os.environ.get("ARCHIVE_COMPACT_RATIO", "2"))
+
+def sort_items(items):
+    """日存档的排序方式：按发布时间倒序"""
+    return sorted(items, key=lambda x: x['timestamp'], reverse=True)
+
+
+class JsonStore:
+    """每日一个 JSON 数组文件，读写都是整日进行"""
+
+    name = "json"
+
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+
+    def view_path(self, date_str):
+        return os.path.join(self.archive_dir, f"{date_str}.json")
+
+    def load_day(self, date_str):
+        path = self.view_path(date_str)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def iter_day(self, date_str):
+        return iter(self.load_day(date_str))
+
+    def count_items(self, date_str):
+        return len(self.load_day(date_str))
+
+    def save_day(self, date_str, items, upserts=(), deletes=()):
+        """
+        保存一天的完整条目列表（已排序）。upserts/deletes 为相对上次保存新增或修改的条目、
+        删除的条目键，JSON 模式下用不到。返回 (是否写入, 视图字节)
+        """
+        return write_json_if_changed(self.view_path(date_str), items)
+
+    def dates(self):
+        from archive_index import list_archive_dates
+        return list_archive_dates(self.archive_dir)
+
+    def has_day(self, date_str):
+        return os.path.exists(self.view_path(date_str))
+
+    def import_day(self, date_str, items):
+        """用 JSON 视图的内容建立该日的存储记录（切换存储方式时使用）"""
+
+    def export_day(self, date_str):
+        """由存储记录重新生成该日的 JSON 视图，返回 (是否写入, 视图字节)"""
+        return False, None
+
+    def flush_views(self):
+        """写出暂存的 JSON 视图（视图随 save_day 立即写入的存储无事可做），返回写入的日期列表"""
+        return []
+
+
+class JsonlStore(JsonStore):
+    """
+    追加写日志：每行一条记录 {"op": "put", "key", "item"} 或 {"op": "del", "key"}，
+    同一个键以最后一条记录为准。崩溃时最多丢失最后一行未写完的记录。
+
+    save_day 只追加日志，JSON 视图暂存在内存里，由 flush_views() 在运行结束时每个日期写一次，
+    保存本身的磁盘写入只与改动条数有关。代价是日志和视图之间有一个不一致的窗口：
+    追加之后、flush_views 之前崩溃时视图停留在旧内容（日志仍是准的，读取都走日志），
+    直到该日期下次有改动，或执行 python archive_store.py --export 重新导出。
+    """
+
+    name = "jsonl"
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, journal_dir=JOURNAL_DIR):
+        super().__init__(archive_dir)
+        self.journal_dir = journal_dir
+        self.pending_views = {}  # date -> 待写出的完整条目列表
+
+    def journal_path(self, date_str):
+        return os.path.join(self.journal_dir, f"{date_str}.jsonl")
+
+    def iter_records(self, date_str):
+        """逐行读取日志记录，不一次性载入整个文件；跳过写到一半的行"""
+        path = self.journal_path(date_str)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"⚠️ {path}:{line_no} 记录不完整，已跳过")
+
+    def fold(self, date_str):
+        """把日志折叠成 {key: item}（保持首次出现的顺序）"""
+        items = {}
+        for record in self.iter_records(date_str):
+            if record.get("op") == "del":
+                items.pop(record["key"], None)
+            else:
+                items[record["key"]] = record["item"]
+        return items
+
+    def load_day(self, date_str):
+        if not os.path.exists(self.journal_path(date_str)):
+            # 还没有日志的日期（旧存档或刚切换模式）直接读视图
+            return super().load_day(date_str)
+        return sort_items(self.fold(date_str).values())
+
+    def iter_day(self, date_str):
+        """逐条产出折叠后的有效条目（按日志中最后一次写入的顺序，不排序），不在内存里保留整日条目"""
+        if not os.path.exists(self.journal_path(date_str)):
+            return super().iter_day(date_str)
+        return self._iter_folded(date_str)
+
+    def _iter_folded(self, date_str):
+        # 两遍扫描：第一遍只记下每个键最后一条记录的序号（删除记为 None），第二遍产出仍是最后一条的 put
+        last = {}
+        for n, record in enumerate(self.iter_records(date_str)):
+            last[record["key"]] = None if record.get("op") == "del" else n
+        for n, record in enumerate(self.iter_records(date_str)):
+            if record.get("op") != "del" and last.get(record["key"]) == n:
+                yield record["item"]
+
+    def count_items(self, date_str):
+        """只统计有效键，不保留条目内容"""
+        if not os.path.exists(self.journal_path(date_str)):
+            return super().count_items(date_str)
+        keys = set()
+        for record in self.iter_records(date_str):
+            if record.get("op") == "del":
+                keys.discard(record["key"])
+            else:
+                keys.add(record["key"])
+        return len(keys)
+
+    def _write_journal(self, date_str, items):
+        """整体重写日志（每个有效条目一行，与视图顺序一致），先写临时文件再替换"""
+        lines = [json.dumps({"op": "put", "key": get_item_title_key(item), "item": item},
+                            ensure_ascii=False, separators=(',', ':')) + "\n" for item in items]
+        write_atomic(self.journal_path(date_str), "".join(lines), fsync=True)
+
+    def append(self, date_str, upserts=(), deletes=()):
+        lines = [{"op": "del", "key": key} for key in deletes]
+        lines += [{"op": "put", "key": get_item_title_key(item), "item": item} for item in upserts]
+        if not lines:
+            return
+        os.makedirs(self.journal_dir, exist_ok=True)
+        path = self.journal_path(date_str)
+        # 上次写到一半的行没有换行符，先补上，避免和新记录粘在一起
+        partial = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                partial = f.read(1) != b"\n"
+        with open(path, 'a', encoding='utf-8') as f:
+            if partial:
+                f.write("\n")
+            for record in lines:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def has_day(self, date_str):
+        return os.path.exists(self.journal_path(date_str))
+
+    def import_day(self, date_str, items):
+        self._write_journal(date_str, items)
+
+    def export_day(self, date_str):
+        return self.compact(date_str)
+
+    def save_day(self, date_str, items, upserts=(), deletes=()):
+        """
+        追加日志并暂存视图，返回 (日志是否有改动, 视图字节)。
+        视图文件由 flush_views() 写出，调用方在读取视图文件（索引、首页）之前需要先调用它
+        """
+        if not os.path.exists(self.journal_path(date_str)):
+            # 首次写入：用完整列表建立日志
+            self._write_journal(date_str, items)
+            changed = True
+        else:
+            self.append(date_str, upserts, deletes)
+            self.maybe_compact(date_str, len(items))
+            changed = bool(upserts or deletes)
+        # iter_day 按日志顺序产出，视图按时间倒序
+        items = sort_items(items)
+        self.pending_views[date_str] = items
+        return changed, dump_json(items)
+
+    def flush_views(self):
+        written = []
+        for date_str, items in sorted(self.pending_views.items()):
+            if super().save_day(date_str, items)[0]:
+                written.append(date_str)
+        self.pending_views.clear()
+        return written
+
+    def maybe_compact(self, date_str, live_count):
+        with open(self.journal_path(date_str), 'rb') as f:
+            records = sum(1 for _ in f)
+        if records > max(live_count, 1) * COMPACT_RATIO:
+            # 只重写日志，视图仍由 flush_views 写出
+            self._write_journal(date_str, sort_items(self.fold(date_str).values()))
+
+    def compact(self, date_str):
+        """折叠日志：重写为每个有效条目一行，并重新生成排序后的 JSON 视图。返回 (是否写入视图, 视图字节)"""
+        items = sort_items(self.fold(date_str).values())
+        self._write_journal(date_str, items)
+        self.pending_views.pop(date_str, None)
+        return super().save_day(date_str, items)
+
+    def dates(self):
+        if not os.path.exists(self.journal_dir):
+            return []
+        return sorted(f[:-len(".jsonl")] for f in os.listdir(self.journal_dir) if f.endswith(".jsonl"))
+
+
+class SqliteStore(JsonStore):
+    """
+    SQLite 存档：每条新闻一行，(date, key) 为主键，link / key / timestamp / category / origin 建索引，
+    “链接是否已知”“某分类本月的新闻”“某来源的新闻”都走索引查询，不再扫描解析 JSON 文件。
+    JSON 视图按日导出，只是派生缓存。
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            date TEXT NOT NULL,
+            key TEXT NOT NULL,
+            link TEXT,
+            timestamp INTEGER,
+            category TEXT,
+            origin TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (date, key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_link ON items(link);
+        CREATE INDEX IF NOT EXISTS idx_items_key ON items(key);
+        CREATE INDEX IF NOT EXISTS idx_items_timestamp ON items(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_items_category ON items(category, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_items_origin ON items(origin, timestamp);
+    """
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, db_path=ARCHIVE_DB):
+        super().__init__(archive_dir)
+        self.db_path = db_path
+        # 流水线多进程同时写入时等待锁，而不是立即报错
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def _rows(self, sql, params=()):
+        """逐行返回条目，不一次性取出全部结果"""
+        for (data,) in self.conn.execute(sql, params):
+            yield json.loads(data)
+
+    def iter_day(self, date_str):
+        if not self.has_day(date_str):
+            # 库里还没有的日期（未导入的旧存档或刚切换模式）直接读视图，
+            # 否则首次 save_day 会用只含新条目的列表覆盖视图
+            return iter(super().load_day(date_str))
+        # rowid 升序与 JSON 模式下 data_map 的插入顺序一致，同一时间戳的条目顺序不变
+        return self._rows("SELECT data FROM items WHERE date = ? ORDER BY timestamp DESC, rowid", (date_str,))
+
+    def load_day(self, date_str):
+        return list(self.iter_day(date_str))
+
+    def count_items(self, date_str):
+        if not self.has_day(date_str):
+            return len(super().load_day(date_str))
+        return self.conn.execute("SELECT COUNT(*) FROM items WHERE date = ?", (date_str,)).fetchone()[0]
+
+    def dates(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT date FROM items ORDER BY date")]
+
+    def has_day(self, date_str):
+        return self.conn.execute("SELECT 1 FROM items WHERE date = ? LIMIT 1", (date_str,)).fetchone() is not None
+
+    def _upsert(self, date_str, items):
+        # ON CONFLICT 更新保留原 rowid，即保留条目原来的位置
+        self.conn.executemany(
+            """INSERT INTO items (date, key, link, timestamp, category, origin, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(date, key) DO UPDATE SET
+                   link = excluded.link, timestamp = excluded.timestamp, category = excluded.category,
+                   origin = excluded.origin, data = excluded.data""",
+            [(date_str, get_item_title_key(item), item.get('link'), item.get('timestamp'),
+              item.get('category'), item.get('origin'),
+              json.dumps(item, ensure_ascii=False, separators=(',', ':'))) for item in items]
+        )
+
+    def import_day(self, date_str, items):
+        with self.conn:
+            self.conn.execute("DELETE FROM items WHERE date = ?", (date_str,))
+            self._upsert(date_str, items)
+
+    def save_day(self, date_str, items, upserts=(), deletes=()):
+        with self.conn:
+            if not self.has_day(date_str):
+                # 首次写入：用完整列表建立记录
+                self._upsert(date_str, items)
+            else:
+                self.conn.executemany("DELETE FROM items WHERE date = ? AND key = ?",
+                                      [(date_str, key) for key in deletes])
+                self._upsert(date_str, upserts)
+        return super().save_day(date_str, items)
+
+    def export_day(self, date_str):
+        return super().save_day(date_str, self.load_day(date_str))
+
+    # --- 索引查询 ---
+    def find_by_link(self, link):
+        """返回 [(date, item), ...]"""
+        rows = self.conn.execute("SELECT date, data FROM items WHERE link = ?", (link,))
+        return [(date_str, json.loads(data)) for date_str, data in rows]
+
+    def find_by_key(self, key):
+        rows = self.conn.execute("SELECT date, data FROM items WHERE key = ?", (key,))
+        return [(date_str, json.loads(data)) for date_str, data in rows]
+
+    def query(self, category=None, origin=None, since=None, until=None, limit=None):
+        """按分类 / 来源 / 时间范围（Unix 时间戳，含 since 不含 until）查询，按时间倒序返回条目"""
+        clauses, params = [], []
+        for column, op, value in (("category", "=", category), ("origin", "=", origin),
+                                  ("timestamp", ">=", since), ("timestamp", "<", until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        sql = "SELECT data FROM items"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return list(self._rows(sql, params))
+
+
+STORES = {"json": JsonStore, "jsonl": JsonlStore, "sqlite": SqliteStore}
+
+def get_store(archive_dir=ARCHIVE_DIR, mode=None):
+    mode = mode or ARCHIVE_STORE
+    if mode not in STORES:
+        raise ValueError(f"未知的 ARCHIVE_STORE: {mode}（可选: {', '.join(STORES)}）")
+    return STORES[mode](archive_dir)
+
+def export_views(store=None, archive_dir=ARCHIVE_DIR):
+    """
+    导出静态视图：由存储记录重新生成每日的 archive/<date>.json，
+    再更新 archive/index.json 和首页 data.json（含分片首页）。返回 {date: 条数}
+    """
+    from archive_index import update_index
+    from homepage import write_homepage
+
+    store = store or get_store(archive_dir)
+    exported = {}
+    for date_str in store.dates():
+        changed, _ = store.export_day(date_str)
+        exported[date_str] = store.count_items(date_str)
+        if changed:
+            print(f"已导出 {date_str}.json")
+    update_index(exported, archive_dir)
+    homepage_news, _ = write_homepage(archive_dir)
+    print(f"导出完成：{len(exported)} 天，首页 {len(homepage_news)} 条")
+    return exported
+
+if __name__ == "__main__":
+    # 以下命令作用于 ARCHIVE_STORE 指定的存储（jsonl / sqlite）
+    # python archive_store.py --import   用现有 JSON 存档建立存储记录（切换存储方式前执行一次）
+    # python archive_store.py --export   由存储记录导出 archive/*.json、index.json、data.json
+    #                                    （jsonl 模式下同时折叠日志）
+    store = get_store()
+    if "--import" in sys.argv:
+        json_store = JsonStore(store.archive_dir)
+        for date_str in json_store.dates():
+            if not store.has_day(date_str):
+                store.import_day(date_str, json_store.load_day(date_str))
+                print(f"已导入: {date_str}")
+    if "--export" in sys.argv:
+        export_views(store)
@@ -0,0 +1,135 @@
+"""
+正文页补全的本地 HTTP 检查：用 http.server 模拟出版方页面，验证编码识别、跳转、失败处理、
+Google News 中转页、每主机并发上限与缓存复用，并报告补全阶段的耗时。127.0.0.1 充当 Google News 主机，localhost 充当出版方。
+
+用法（仓库根目录）: python benchmarks/bench_enrichment.py [每个请求的延迟秒数]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import enrichment
+from enrichment import EnrichmentCache, HostLimiter, enrich_links, fetch_page
+
+LATENCY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.02
+TITLE = "中国外務省が声明を発表"
+
+def page(charset_meta=""):
+    return (f"<html><head>{charset_meta}<meta property=\"og:description\" content=\"{TITLE}\">"
+            f"<meta property=\"og:image\" content=\"/img.jpg\"></head><body>{TITLE}の本文</body></html>")
+
+
+class Handler(BaseHTTPRequestHandler):
+    active = {}
+    peak = {}
+    requests = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def send_html(self, body, content_type="text/html"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        host = self.headers.get("Host", "").split(":")[0]
+        with Handler.lock:
+            Handler.requests += 1
+            Handler.active[host] = Handler.active.get(host, 0) + 1
+            Handler.peak[host] = max(Handler.peak.get(host, 0), Handler.active[host])
+        try:
+            time.sleep(LATENCY)
+            self.route()
+        finally:
+            with Handler.lock:
+                Handler.active[host] -= 1
+
+    def route(self):
+        port = self.server.server_address[1]
+        if self.path == "/utf8-header":
+            self.send_html(page().encode("utf-8"), "text/html; charset=utf-8")
+        elif self.path == "/utf8-plain":
+            self.send_html(page().encode("utf-8"))
+        elif self.path == "/sjis-meta":
+            self.send_html(page('<meta charset="Shift_JIS">').encode("shift_jis"))
+        elif self.path == "/sjis-plain":
+            self.send_html(page().encode("shift_jis"))
+        elif self.path.startswith("/redirect/"):
+            self.send_response(302)
+            self.send_header("Location", f"http://localhost:{port}/utf8-header")
+            self.end_headers()
+        elif self.path.startswith("/gn/"):
+            # Google News 中转页：登录链接在前，原文链接在 data-n-au 上（出版方分散在 127.0.0.2-21）
+            article = self.path.split("/")[-1]
+            host = "localhost" if article == "7" else f"127.0.0.{2 + int(article) % 20}"
+            self.send_html((f'<html><body><a href="https://accounts.google.com/ServiceLogin">login</a>'
+                            f'<c-wiz data-n-au="http://{host}:{port}/article/{article}"></c-wiz>'
+                            f'</body></html>').encode("utf-8"), "text/html; charset=utf-8")
+        elif self.path.startswith("/gn-login/"):
+            self.send_html(b'<html><body><a href="https://accounts.google.com/ServiceLogin">login</a></body></html>',
+                           "text/html; charset=utf-8")
+        elif self.path.startswith("/article/"):
+            self.send_html(page().encode("utf-8"), "text/html; charset=utf-8")
+        else:
+            self.send_error(404)
+
+
+def check(name, ok, detail=""):
+    print(f"  {'✅' if ok else '❌'} {name}{f'：{detail}' if detail else ''}")
+    return ok
+
+def main():
+    server = ThreadingHTTPServer(("", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    enrichment.GOOGLE_NEWS_HOSTS = ("127.0.0.1",)
+    publisher = f"http://localhost:{port}"
+    results = []
+
+    print("编码识别")
+    for path in ("/utf8-header", "/utf8-plain", "/sjis-meta", "/sjis-plain"):
+        try:
+            _, html = fetch_page(publisher + path, HostLimiter(2))
+            results.append(check(path, TITLE in html))
+        except Exception as e:
+            results.append(check(path, False, f"{type(e).__name__}: {e}"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EnrichmentCache(path=os.path.join(tmp, "enrichment.json"))
+        links = [f"http://127.0.0.1:{port}/gn/{i}" for i in range(100, 140)]
+        links += [f"{publisher}/article/{i}" for i in range(40)]
+        links += [f"http://127.0.0.1:{port}/gn/7", f"http://127.0.0.1:{port}/gn-login/1"]
+        links += [f"{publisher}/redirect/1", f"{publisher}/missing"]
+
+        print(f"补全 {len(links)} 条链接 (每请求 {LATENCY * 1000:.0f}ms，并发 8，出版方每主机 2)")
+        Handler.peak.clear()
+        start = time.monotonic()
+        out = enrich_links(links, workers=8, per_host=2, cache=cache, enabled=True)
+        elapsed = time.monotonic() - start
+        results.append(check("出版方页面 og 字段", out[40]["summary"] == TITLE and out[0]["image"].endswith("/img.jpg")))
+        results.append(check("中转页取 data-n-au 原文链接", out[-4]["url"] == f"{publisher}/article/7", out[-4]["url"]))
+        results.append(check("中转页只有 Google 链接时不改写", out[-3]["url"] == "", out[-3]["url"]))
+        results.append(check("跟随跳转", out[-2]["url"] == f"{publisher}/utf8-header", out[-2]["url"]))
+        results.append(check("404 返回空字段", out[-1] == {"url": "", "image": "", "summary": ""}))
+        results.append(check("出版方每主机并发上限", Handler.peak.get("localhost", 0) <= 2,
+                             f"峰值 {Handler.peak.get('localhost', 0)}，耗时 {elapsed:.2f}s"))
+        results.append(check("Google News 一跳不受出版方上限限制", Handler.peak.get("127.0.0.1", 0) > 2,
+                             f"峰值 {Handler.peak.get('127.0.0.1', 0)}"))
+
+        before = Handler.requests
+        enrich_links(links[:-1], workers=8, per_host=2, cache=cache, enabled=True)
+        results.append(check("第二次运行命中缓存", Handler.requests == before, f"新请求 {Handler.requests - before} 次"))
+
+    server.shutdown()
+    return 0 if all(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+各入口脚本的启动（导入）耗时：用 python -X importtime 在子进程中导入入口模块，
+取该模块累计导入耗时多次运行的中位数，并列出被一并导入的重量级依赖。
+
+用法（仓库根目录）: python benchmarks/bench_import_time.py [模块名 ...]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ["maintenance", "archive_pipeline", "fix_logos", "clean_stock_garbage", "migrate_tc",
+                "archive_store", "search_index", "news_core", "main"]
+HEAVY_MODULES = ["boto3", "botocore", "feedparser", "bs4", "deep_translator", "requests", "opencc"]
+RUNS = 5
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def measure(module):
+    """返回 (累计导入耗时 ms, 被导入的重量级依赖列表)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    total = 0
+    heavy = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)), match.group(4)
+        # 入口模块自身一行的累计耗时（不含解释器启动时 site 等模块的导入）
+        if name == module:
+            total = cumulative
+        if name in HEAVY_MODULES:
+            heavy.append(name)
+    return total / 1000, heavy
+
+def main():
+    modules = sys.argv[1:] or ENTRY_POINTS
+    print(f"导入耗时（-X importtime，{RUNS} 次中位数）")
+    for module in modules:
+        samples = [measure(module) for _ in range(RUNS)]
+        median = statistics.median(ms for ms, _ in samples)
+        heavy = samples[0][1]
+        print(f"  {module:<20} {median:8.1f} ms   重量级依赖: {', '.join(heavy) if heavy else '无'}")
+
+if __name__ == "__main__":
+    main()
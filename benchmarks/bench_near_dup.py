@@ -0,0 +1,85 @@
+"""
+近似重复索引基准：在真实存档标题及按存档规模放大的标题集上，
+测量 NearDupIndex 的建索引与单次查询开销，并与逐条计算 Jaccard 的暴力扫描对比结果和耗时。
+
+用法（仓库根目录）: python benchmarks/bench_near_dup.py [放大后的标题数 ...]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from near_dup import NEAR_DUP_THRESHOLD, NearDupIndex, jaccard, numbers, shingles
+
+ARCHIVE_DIR = "public/archive"
+
+def load_titles():
+    titles = []
+    for filename in sorted(os.listdir(ARCHIVE_DIR)):
+        if filename.endswith(".json") and filename != "index.json":
+            with open(os.path.join(ARCHIVE_DIR, filename), 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    title = item.get('title_ja') or item.get('original_title') or ""
+                    if title:
+                        titles.append(title)
+    return titles
+
+def scale_titles(titles, count, seed=42):
+    """把真实标题打散重组，得到 count 条风格相近、内容不同的标题"""
+    rng = random.Random(seed)
+    pieces = [t.split(" - ")[0] for t in titles]
+    scaled = list(titles)
+    while len(scaled) < count:
+        a, b = rng.sample(pieces, 2)
+        cut_a, cut_b = rng.randint(1, len(a)), rng.randint(0, len(b) - 1)
+        scaled.append(f"{a[:cut_a]}{b[cut_b:]}{rng.randint(1, 999)} - {rng.choice(['共同通信', '時事通信', 'Yahoo!ニュース'])}")
+    return scaled[:count]
+
+def brute_force_find(entries, title):
+    target, target_numbers = shingles(title), numbers(title)
+    best, best_score = None, 0.0
+    for entry_id, (entry_shingles, entry_numbers) in enumerate(entries):
+        if entry_numbers != target_numbers:
+            continue
+        score = jaccard(target, entry_shingles)
+        if score > best_score:
+            best, best_score = entry_id, score
+    return best if best_score >= NEAR_DUP_THRESHOLD else None
+
+def run(titles, queries):
+    start = time.perf_counter()
+    index = NearDupIndex()
+    for i, title in enumerate(titles):
+        index.add(title, i)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [index.find(title)[0] for title in queries]
+    lookup = time.perf_counter() - start
+
+    entries = [(shingles(t), numbers(t)) for t in titles]
+    start = time.perf_counter()
+    expected = [brute_force_find(entries, title) for title in queries]
+    brute = time.perf_counter() - start
+
+    # 两者都找到时允许相似度并列的不同条目，只统计“一方找到、一方没找到”的情况
+    missed = sum(1 for got, want in zip(found, expected) if (got is None) != (want is None))
+    hits = sum(1 for got in found if got is not None)
+    print(f"  {len(titles):>6} 条：建索引 {build * 1000:8.1f} ms ({build / len(titles) * 1e6:.0f} µs/条)，"
+          f"查询 {lookup / len(queries) * 1e6:6.0f} µs/次 (平均候选 {index.candidates_checked / len(queries):.1f})，"
+          f"暴力扫描 {brute / len(queries) * 1e6:8.0f} µs/次；命中 {hits}/{len(queries)}，与暴力扫描不一致 {missed}")
+
+def main():
+    titles = load_titles()
+    sizes = [int(arg) for arg in sys.argv[1:]] or [len(titles), 5000, 20000]
+    rng = random.Random(7)
+    # 查询：一半是存档里的转载标题（应命中自身或其近似条目），一半是新拼出来的标题
+    queries = rng.sample(titles, min(200, len(titles))) + scale_titles(titles, len(titles) + 200, seed=99)[-200:]
+    print(f"近似重复索引 (阈值 {NEAR_DUP_THRESHOLD})，查询 {len(queries)} 次")
+    for size in sizes:
+        run(scale_titles(titles, size), queries)
+
+if __name__ == "__main__":
+    main()
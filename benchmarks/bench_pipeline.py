@@ -0,0 +1,457 @@
+"""
+端到端离线基准：用合成的 RSS、确定性的假翻译接口（可设延迟）、本地的 S3 替身，
+在不同规模的 RSS 条目数 × 存档天数下完整运行一轮 main.update_news，
+按阶段报告耗时、峰值内存 (RSS) 和读写字节数，并与保存的基准线比较。
+
+每个场景在独立子进程、独立工作目录中运行（各模块的缓存和配置互不影响）；
+同一存档规模的存档、索引、检索分片只生成一次，各场景复制使用，不计入耗时。
+每种存档规模另跑一个 <条数>x<天数>d-cold 场景：不带检索索引启动（如 CI 缓存失效后的首次运行），
+计入按全部存档重建索引的耗时。
+
+用法（仓库根目录）:
+  python benchmarks/bench_pipeline.py                      默认矩阵 100/1k/10k 条 × 30 天/1 年/5 年
+  python benchmarks/bench_pipeline.py --entries 100,1000 --days 30
+  python benchmarks/bench_pipeline.py --save               把本次结果存为基准线
+  python benchmarks/bench_pipeline.py --check              与基准线相比变慢超过阈值时以非 0 退出
+
+环境变量: BENCH_TRANSLATE_LATENCY / BENCH_ENRICH_LATENCY / BENCH_FEED_LATENCY（秒/次请求），
+BENCH_ITEMS_PER_DAY（存档每天条数），BENCH_KNOWN_RATIO（RSS 中已存档条目的比例），
+BENCH_REGRESSION（判定变慢的比例，默认 0.2）
+"""
+import datetime
+import email.utils
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from xml.sax.saxutils import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baselines", "pipeline.json")
+DEFAULT_ENTRIES = [100, 1000, 10000]
+DEFAULT_DAYS = [30, 365, 1826]
+
+TRANSLATE_LATENCY = float(os.environ.get("BENCH_TRANSLATE_LATENCY", "0.2"))
+ENRICH_LATENCY = float(os.environ.get("BENCH_ENRICH_LATENCY", "0.02"))
+FEED_LATENCY = float(os.environ.get("BENCH_FEED_LATENCY", "0"))
+ITEMS_PER_DAY = int(os.environ.get("BENCH_ITEMS_PER_DAY", "70"))
+KNOWN_RATIO = float(os.environ.get("BENCH_KNOWN_RATIO", "0.5"))
+REGRESSION = float(os.environ.get("BENCH_REGRESSION", "0.2"))
+# RSS 条目的发布时间分布在最近这么多秒内
+FEED_SPAN = 2 * 86400
+
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+# === 合成数据 ===
+SOURCES = [
+    ("共同通信", "https://www.kyodo.co.jp"), ("時事通信", "https://www.jiji.com"),
+    ("日本経済新聞", "https://www.nikkei.com"), ("NHK", "https://www3.nhk.or.jp"),
+    ("Yahoo!ニュース", "https://news.yahoo.co.jp"), ("読売新聞", "https://www.yomiuri.co.jp"),
+    ("朝日新聞", "https://www.asahi.com"), ("産経ニュース", "https://www.sankei.com"),
+    ("毎日新聞", "https://mainichi.jp"), ("東洋経済オンライン", "https://toyokeizai.net"),
+    ("FNNプライムオンライン", "https://www.fnn.jp"), ("Bloomberg", "https://www.bloomberg.co.jp"),
+]
+SUBJECTS = ["中国外務省", "習近平国家主席", "中国軍", "人民解放軍", "中国商務省", "中国海警局", "台湾当局",
+            "日中両政府", "中国人民銀行", "北京市", "上海市", "香港政府", "中国の電気自動車大手", "中国国家統計局"]
+ACTIONS = ["が反発", "が声明を発表", "が演習を実施", "が輸出規制を強化", "が会談", "が関税引き上げを表明",
+           "が訪日客の減少を懸念", "が半導体支援策", "が景気刺激策を検討", "が抗議", "が新型艦を公開"]
+TOPICS = ["尖閣周辺", "台湾海峡", "南シナ海", "日本産水産物", "レアアース", "不動産市場", "個人消費",
+          "邦人拘束", "米中関係", "サイバー攻撃", "留学生", "訪日観光", "日本企業", "輸出入"]
+SUFFIXES = ["速報", "詳報", "専門家の見方", "背景を解説", "関係者", "初めて", "前年比", "異例の対応"]
+CATEGORIES = ["时政", "经济", "军事", "社会", "科技", "体育", "其他"]
+
+
+def make_title(rng, serial):
+    """风格接近 Google News 标题的日文标题，带编号数字以免不同条目被判为近似重复"""
+    return (f"{rng.choice(SUBJECTS)}{rng.choice(ACTIONS)} {rng.choice(TOPICS)}で{rng.choice(SUFFIXES)}"
+            f" {serial % 97 + 1}件目の{rng.choice(TOPICS)}")
+
+def fake_translate(text, target):
+    """确定性的假译文：逐行加上目标语言前缀"""
+    return "\n".join(f"[{target}]{line}" for line in text.split("\n"))
+
+def make_link(serial):
+    return f"https://news.google.com/rss/articles/BENCH{hashlib.md5(str(serial).encode()).hexdigest()}?oc=5"
+
+def make_item(rng, serial, timestamp):
+    origin, _ = rng.choice(SOURCES)
+    title_ja = f"{make_title(rng, serial)} - {origin}"
+    dt = datetime.datetime.fromtimestamp(timestamp, JST)
+    return {
+        "title": fake_translate(title_ja, "zh-CN"),
+        "title_tc": fake_translate(title_ja, "zh-TW"),
+        "title_ja": title_ja,
+        "link": make_link(serial),
+        "image": "",
+        "logo": "",
+        "summary": "",
+        "category": rng.choice(CATEGORIES),
+        "time_str": dt.strftime("%m-%d %H:%M"),
+        "timestamp": timestamp,
+        "fetched_at": timestamp + 300,
+        "origin": origin,
+    }
+
+def generate_archive(archive_dir, days, now, seed=1):
+    """生成最近 days 天的存档（每天 ITEMS_PER_DAY 条，今天只到当前时刻），返回条目数"""
+    from publish import write_json_if_changed
+    rng = random.Random(seed)
+    os.makedirs(archive_dir, exist_ok=True)
+    today = datetime.datetime.fromtimestamp(now, JST).date()
+    serial = 0
+    for offset in range(days):
+        day = today - datetime.timedelta(days=offset)
+        start = int(datetime.datetime(day.year, day.month, day.day, tzinfo=JST).timestamp())
+        end = min(start + 86400, now)
+        items = []
+        for _ in range(ITEMS_PER_DAY):
+            serial += 1
+            items.append(make_item(rng, serial, rng.randrange(start, end)))
+        items.sort(key=lambda x: x["timestamp"], reverse=True)
+        write_json_if_changed(os.path.join(archive_dir, f"{day.isoformat()}.json"), items)
+    return serial
+
+def generate_rss(entries, known_items, now, seed=2):
+    """合成 Google News 格式的 RSS：known_items 原样出现（已存档条目），其余为新条目"""
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+             '<title>"中国" - Google ニュース</title><link>https://news.google.com</link>']
+    domains = dict(SOURCES)
+    for i in range(entries):
+        if i < len(known_items):
+            item = known_items[i]
+            title, link, origin, timestamp = item["title_ja"], item["link"], item["origin"], item["timestamp"]
+        else:
+            origin, _ = rng.choice(SOURCES)
+            serial = 10 ** 8 + i
+            title = f"{make_title(rng, serial)} - {origin}"
+            link, timestamp = make_link(serial), now - rng.randrange(FEED_SPAN)
+        parts.append(
+            f"<item><title>{escape(title)}</title><link>{escape(link)}</link>"
+            f'<guid isPermaLink="false">{escape(link)}</guid>'
+            f"<pubDate>{email.utils.formatdate(timestamp, usegmt=True)}</pubDate>"
+            f"<description>{escape(f'<a href={chr(34)}{link}{chr(34)}>{title}</a>')}</description>"
+            f'<source url="{domains[origin]}">{escape(origin)}</source></item>')
+    parts.append("</channel></rss>")
+    return "".join(parts)
+
+
+# === 替身 ===
+class FakeTranslator:
+    """deep_translator.GoogleTranslator 的替身：固定延迟，译文确定"""
+
+    def __init__(self, source, target):
+        self.target = target
+
+    def translate(self, text):
+        time.sleep(TRANSLATE_LATENCY)
+        return fake_translate(text, self.target)
+
+
+class LocalS3:
+    """R2 (S3) 客户端的本地替身：对象保存在内存中，ETag 为内容 MD5"""
+
+    def __init__(self):
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        with self.lock:
+            self.objects[Key] = bytes(Body)
+
+    def head_object(self, Bucket, Key):
+        with self.lock:
+            if Key not in self.objects:
+                raise KeyError(Key)
+            return {"ETag": f'"{hashlib.md5(self.objects[Key]).hexdigest()}"'}
+
+
+def publisher_url(link):
+    """Google News 链接跳转到的出版方文章地址（分散在 20 个出版方主机上）"""
+    digest = hashlib.md5(link.encode()).hexdigest()
+    return f"https://p{int(digest[:2], 16) % 20}.publisher.example/{digest}"
+
+def fake_page(url):
+    return (f'<html><head><meta property="og:url" content="{url}">'
+            f'<meta property="og:image" content="https://publisher.example/img.jpg">'
+            f'<meta property="og:description" content="合成された記事の概要です。"></head><body></body></html>')
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\0" * 200
+
+
+# === 资源采样 ===
+def read_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def read_io():
+    """(读, 写) 字节数；/proc 不可用时为 (0, 0)"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+class ResourceSampler(threading.Thread):
+    """后台线程每 5ms 读取一次常驻内存，peak() 返回自上次 reset() 以来的峰值"""
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.value = self.overall = read_rss()
+
+    def run(self):
+        while True:
+            rss = read_rss()
+            self.value = max(self.value, rss)
+            self.overall = max(self.overall, rss)
+            time.sleep(self.interval)
+
+    def reset(self):
+        peak, self.value = self.value, read_rss()
+        return max(peak, self.value)
+
+
+def make_profiled_metrics(sampler, profile):
+    """
+    换成 RunMetrics 的子类：每次切换阶段时把该阶段的峰值内存和读写字节数记入 profile，
+    运行报告写出后存入 profile["report"]
+    """
+    import metrics
+
+    class ProfiledRunMetrics(metrics.RunMetrics):
+        def begin(self, name):
+            self.end()
+            sampler.reset()
+            self.io_start = read_io()
+            super().begin(name)
+
+        def end(self):
+            if self.current:
+                name = self.current[0]
+                read, write = read_io()
+                stage = profile["stages"].setdefault(name, {"peak_rss_mb": 0, "read_kb": 0, "write_kb": 0})
+                stage["peak_rss_mb"] = max(stage["peak_rss_mb"], round(sampler.reset() / 2 ** 20, 1))
+                stage["read_kb"] += (read - self.io_start[0]) // 1024
+                stage["write_kb"] += (write - self.io_start[1]) // 1024
+            super().end()
+
+        def write(self, *args, **kwargs):
+            profile["report"] = super().write(*args, **kwargs)
+            return profile["report"]
+
+    metrics.RunMetrics = ProfiledRunMetrics
+
+
+# === 子进程：运行一个场景 ===
+def run_child(work_dir, entries, result_path):
+    os.chdir(work_dir)
+    sampler = ResourceSampler()
+    sampler.start()
+    profile = {"stages": {}}
+    make_profiled_metrics(sampler, profile)
+
+    now = int(time.time())
+    with open("bench_known.json", 'r', encoding='utf-8') as f:
+        known_pool = json.load(f)
+    known = known_pool[:int(entries * KNOWN_RATIO)]
+    rss_body = generate_rss(entries, known, now)
+
+    import feedparser
+    parse = feedparser.parse
+
+    def fake_parse(url, etag=None, modified=None, **kwargs):
+        time.sleep(FEED_LATENCY)
+        return parse(rss_body)
+    feedparser.parse = fake_parse
+
+    import translation
+    translation.GoogleTranslator = FakeTranslator
+
+    import enrichment
+    def fake_fetch_page(url, limiter, **kwargs):
+        # 与真实的 fetch_page 一样逐跳占用各自主机的并发额度：Google News 一跳后跳转到出版方
+        if enrichment.is_google_news(url):
+            with limiter.get(url):
+                time.sleep(ENRICH_LATENCY)
+            url = publisher_url(url)
+        with limiter.get(url):
+            time.sleep(ENRICH_LATENCY)
+        return url, fake_page(url)
+    enrichment.fetch_page = fake_fetch_page
+
+    import logo_cache
+    logo_cache.fetch_logo = lambda domain: PNG_BYTES
+
+    s3 = LocalS3()
+    import boto3
+    boto3.client = lambda *args, **kwargs: s3
+
+    import main
+    start = time.monotonic()
+    main.update_news()
+    wall = time.monotonic() - start
+
+    report = profile["report"]
+    for name, stage in report["stages"].items():
+        stage.update(profile["stages"].get(name, {}))
+    result = {
+        "wall": round(wall, 3),
+        "peak_rss_mb": round(sampler.overall / 2 ** 20, 1),
+        "objects_uploaded": len(s3.objects),
+        "stages": report["stages"],
+        "counters": report["counters"],
+        "latency": report["latency"],
+    }
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+# === 主进程：准备存档、调度场景、比较基准线 ===
+def child_env(work_dir):
+    env = dict(os.environ)
+    env.update({
+        "CACHE_DIR": os.path.join(work_dir, ".cache"),
+        "METRICS_DIR": os.path.join(work_dir, ".cache", "metrics"),
+        "FEED_SHARDS": "all",
+        "CLOUDFLARE_ACCOUNT_ID": "bench",
+        "CLOUDFLARE_R2_ACCESS_KEY_ID": "bench",
+        "CLOUDFLARE_R2_SECRET_ACCESS_KEY": "bench",
+        "ARCHIVE_STORE": "json",
+        "PYTHONPATH": ROOT,
+    })
+    env.pop("METRICS_PROM_DIR", None)
+    return env
+
+def build_fixture(fixture_dir, days):
+    """生成 days 天的存档及其派生文件（归档索引、首页分片、检索索引），以及 RSS 可复用的已存档条目"""
+    script = (
+        "import json, sys, time\n"
+        f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+        "from bench_pipeline import generate_archive\n"
+        "from archive_index import rebuild_index\n"
+        "from archive_store import get_store\n"
+        "from homepage import write_homepage, build_homepage_news\n"
+        "from search_index import rebuild_search_index\n"
+        f"generate_archive('public/archive', {days}, int(time.time()))\n"
+        "rebuild_index('public/archive')\n"
+        "write_homepage('public/archive')\n"
+        "rebuild_search_index(get_store('public/archive'))\n"
+        "json.dump(build_homepage_news('public/archive'), open('bench_known.json', 'w'), ensure_ascii=False)\n"
+    )
+    os.makedirs(fixture_dir)
+    subprocess.run([sys.executable, "-c", script], cwd=fixture_dir, env=child_env(fixture_dir),
+                   check=True, stdout=subprocess.DEVNULL)
+
+def run_scenario(fixture_dir, work_dir, entries, cold=False):
+    shutil.copytree(fixture_dir, work_dir)
+    if cold:
+        shutil.rmtree(os.path.join(work_dir, "public", "search"))
+    result_path = os.path.join(work_dir, "bench_result.json")
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", work_dir, str(entries), result_path],
+                          cwd=work_dir, env=child_env(work_dir), capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(proc.stdout[-3000:], proc.stderr[-3000:])
+        raise RuntimeError(f"场景运行失败 (entries={entries})")
+    with open(result_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def format_kb(kb):
+    return f"{kb / 1024:.1f}M" if kb >= 1024 else f"{kb}K"
+
+def print_result(name, result, baseline):
+    diff = ""
+    if baseline:
+        change = result["wall"] / baseline["wall"] - 1
+        diff = f"（基准线 {baseline['wall']:.2f}s，{change:+.0%}{' ⚠️ 变慢' if change > REGRESSION else ''}）"
+    print(f"\n[{name}] 总耗时 {result['wall']:.2f}s{diff}，峰值内存 {result['peak_rss_mb']} MB，"
+          f"上传对象 {result['objects_uploaded']} 个")
+    print(f"  {'阶段':<10}{'耗时':>9}{'基准线':>9}{'峰值内存':>10}{'读':>9}{'写':>9}  条数")
+    for stage, data in result["stages"].items():
+        base = (baseline or {}).get("stages", {}).get(stage, {}).get("seconds")
+        items = " ".join(f"{k}={v}" for k, v in data["items"].items())
+        print(f"  {stage:<10}{data['seconds']:>8.2f}s{'' if base is None else f'{base:.2f}s':>9}"
+              f"{data.get('peak_rss_mb', 0):>8.1f}MB{format_kb(data.get('read_kb', 0)):>9}"
+              f"{format_kb(data.get('write_kb', 0)):>9}  {items}")
+    latency = result["latency"].get("translate_request")
+    if latency:
+        print(f"  翻译请求 {latency['count']} 次：p50 {latency['p50'] * 1000:.0f}ms，p90 {latency['p90'] * 1000:.0f}ms，"
+              f"p99 {latency['p99'] * 1000:.0f}ms")
+    counters = result["counters"]
+    if counters.get("enrich_requests"):
+        # 失败数应为 0：非 0 说明模拟的跳转或中转页解析出了问题，补全阶段的耗时不可信
+        print(f"  补全请求 {counters['enrich_requests']} 次，失败 {counters.get('enrich_failures', 0)} 次")
+
+def parse_list(argv, flag, default):
+    if flag in argv:
+        return [int(x) for x in argv[argv.index(flag) + 1].split(",")]
+    return default
+
+def main(argv):
+    if argv and argv[0] == "--child":
+        run_child(argv[1], int(argv[2]), argv[3])
+        return 0
+
+    entries_list = parse_list(argv, "--entries", DEFAULT_ENTRIES)
+    days_list = parse_list(argv, "--days", DEFAULT_DAYS)
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baselines = json.load(f).get("scenarios", {})
+
+    print(f"端到端基准：翻译延迟 {TRANSLATE_LATENCY}s，补全延迟 {ENRICH_LATENCY}s，"
+          f"存档每天 {ITEMS_PER_DAY} 条，RSS 中已存档条目 {KNOWN_RATIO:.0%}")
+    results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        for days in days_list:
+            fixture_dir = os.path.join(tmp, f"fixture_{days}")
+            start = time.monotonic()
+            build_fixture(fixture_dir, days)
+            print(f"\n准备 {days} 天存档 ({days * ITEMS_PER_DAY} 条) 用时 {time.monotonic() - start:.1f}s")
+            # 最后加一个冷启动场景：没有检索索引，本次运行按全部存档重建
+            scenarios = [(f"{entries}x{days}d", entries, False) for entries in entries_list]
+            scenarios.append((f"{entries_list[0]}x{days}d-cold", entries_list[0], True))
+            for name, entries, cold in scenarios:
+                result = run_scenario(fixture_dir, os.path.join(tmp, name), entries, cold)
+                results[name] = result
+                print_result(name, result, baselines.get(name))
+                baseline = baselines.get(name)
+                if baseline and result["wall"] > baseline["wall"] * (1 + REGRESSION):
+                    regressions.append(name)
+            shutil.rmtree(fixture_dir)
+
+    if "--save" in argv:
+        os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+        baselines.update(results)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({
+                "settings": {"translate_latency": TRANSLATE_LATENCY, "enrich_latency": ENRICH_LATENCY,
+                             "items_per_day": ITEMS_PER_DAY, "known_ratio": KNOWN_RATIO},
+                "python": sys.version.split()[0],
+                "saved_at": datetime.datetime.now(JST).isoformat(timespec="seconds"),
+                "scenarios": baselines,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n基准线已保存到 {os.path.relpath(BASELINE_FILE, ROOT)}")
+    if regressions:
+        print(f"\n⚠️ 比基准线慢 {REGRESSION:.0%} 以上: {', '.join(regressions)}")
+        if "--check" in argv:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,95 @@
+"""
+规则匹配微基准：对比旧版逐词扫描的 classify_news / is_false_positive
+与导入时编译好的 KeywordMatcher 实现，并在真实存档标题上校验两者结果完全一致。
+
+用法（仓库根目录）: python benchmarks/bench_rules.py
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from news_core import (CATEGORY_KEYWORDS, CATEGORY_PRIORITY, IGNORE_KEYWORDS, WHITELIST_KEYWORDS,
+                       classify_news, is_false_positive)
+
+ARCHIVE_DIR = "public/archive"
+
+# --- 旧实现（每次调用重建关键词表 + 逐类 any() 扫描） ---
+def legacy_is_false_positive(title, source_name):
+    if "中国新聞" in source_name:
+        if not any(wk in title for wk in WHITELIST_KEYWORDS):
+            return True
+    for kw in IGNORE_KEYWORDS:
+        if kw in title:
+            if any(wk in title for wk in WHITELIST_KEYWORDS):
+                return False
+            return True
+    return False
+
+def legacy_classify_news(title):
+    keywords = {cat: list(words) for cat, words in CATEGORY_KEYWORDS.items()}
+    for cat in CATEGORY_PRIORITY:
+        if any(w in title for w in keywords[cat]):
+            return cat
+    return "其他"
+
+def load_items():
+    items = []
+    for filename in sorted(os.listdir(ARCHIVE_DIR)):
+        if filename.endswith(".json") and filename != "index.json":
+            with open(os.path.join(ARCHIVE_DIR, filename), 'r', encoding='utf-8') as f:
+                items.extend(json.load(f))
+    return items
+
+def fuzz_titles(count=5000, seed=42):
+    """把规则词随机拼接，覆盖关键词相互重叠的情况"""
+    rng = random.Random(seed)
+    words = [w for ws in CATEGORY_KEYWORDS.values() for w in ws] + IGNORE_KEYWORDS + WHITELIST_KEYWORDS
+    filler = "中国日本のがはと、。在了的"
+    titles = []
+    for _ in range(count):
+        parts = [rng.choice(words) if rng.random() < 0.3 else rng.choice(filler) for _ in range(rng.randint(3, 20))]
+        titles.append("".join(parts))
+    return titles
+
+def bench(label, func, args_list, repeat=5):
+    def run():
+        for args in args_list:
+            func(*args)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    per_call = best / len(args_list) * 1e6
+    print(f"  {label:<16} {best * 1000:8.2f} ms  ({per_call:.2f} µs/次)")
+    return best
+
+def main():
+    items = load_items()
+    zh_titles = [item.get('title') or "" for item in items]
+    ja_args = [(item.get('title_ja') or item.get('title') or "", item.get('origin') or "") for item in items]
+    fuzz = fuzz_titles()
+
+    # 一致性校验
+    mismatches = 0
+    for title in zh_titles + fuzz:
+        if classify_news(title) != legacy_classify_news(title):
+            mismatches += 1
+    for title, source in ja_args + [(t, "中国新聞") for t in fuzz] + [(t, "") for t in fuzz]:
+        if is_false_positive(title, source) != legacy_is_false_positive(title, source):
+            mismatches += 1
+    print(f"一致性校验：{len(zh_titles)} 条存档标题 + {len(fuzz)} 条拼接标题，不一致 {mismatches} 处")
+
+    print(f"classify_news ({len(zh_titles)} 条存档标题):")
+    old = bench("旧实现", legacy_classify_news, [(t,) for t in zh_titles])
+    new = bench("KeywordMatcher", classify_news, [(t,) for t in zh_titles])
+    print(f"  加速 {old / new:.1f}x")
+
+    print(f"is_false_positive ({len(ja_args)} 条存档标题):")
+    old = bench("旧实现", legacy_is_false_positive, ja_args)
+    new = bench("KeywordMatcher", is_false_positive, ja_args)
+    print(f"  加速 {old / new:.1f}x")
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
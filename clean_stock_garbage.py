@@ -1,44 +1,32 @@
 # clean_stock_garbage.py  —— 只删股票垃圾，其他新闻100%保留
-import json
-import os
 import re
+import sys
+from archive_pipeline import fingerprint, register_transform, run_pipeline
 
-# 需要清理的文件
-DATA_FILE = "data.json"
-ARCHIVE_DIR = "archive"
+STOCK_TITLE_PATTERN = r'^中国[々〇〻〆一-龯]{2,5}'
+STOCK_KEYWORDS = ["株価", "上昇", "下落", "出来高", "売買高", "決算", "業績", "配当",
+        "中国塗料", "中国電力", "中国工業", "中国汽船", "中国銀行",
+        "NEXT FUNDS", "华夏基金", "中華股票", "上证50",  "中国株式", 
+        "K线", "チャート", "株価チャート", "株式情報"]
 
 # 股票特征：标题以“中国”开头 + 2~5个汉字，或者包含常见股票词
 def is_stock_garbage(title):
-    if re.search(r'^中国[々〇〻〆一-龯]{2,5}', title):
+    if re.search(STOCK_TITLE_PATTERN, title):
         return True
-    stock_keywords =  ["株価", "上昇", "下落", "出来高", "売買高", "決算", "業績", "配当",
-            "中国塗料", "中国電力", "中国工業", "中国汽船", "中国銀行",
-            "NEXT FUNDS", "华夏基金", "中華股票", "上证50",  "中国株式", 
-            "K线", "チャート", "株価チャート", "株式情報"]
-    if any(kw in title for kw in stock_keywords):
+    if any(kw in title for kw in STOCK_KEYWORDS):
         return True
     return False
 
-# 1. 清理 data.json
-if os.path.exists(DATA_FILE):
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    cleaned = [item for item in data if not is_stock_garbage(item['title'])]
-    removed = len(data) - len(cleaned)
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cleaned, f, ensure_ascii=False, indent=2)
-    print(f"data.json 清理完成：删除了 {removed} 条股票垃圾，保留 {len(cleaned)} 条正常新闻")
+# 规则较宽（“上昇”“下落”等词也会命中普通新闻），不随完整流水线默认执行，
+# 需要时用 python clean_stock_garbage.py（或 archive_pipeline.py --only stock_garbage）单独运行，建议先 --dry-run
+@register_transform("stock_garbage", fingerprint(STOCK_TITLE_PATTERN, STOCK_KEYWORDS), order=40, default=False)
+def drop_stock_garbage(item):
+    if is_stock_garbage(item['title']):
+        return None
+    return item
 
-# 2. 清理 archive 目录下所有历史文件
-if os.path.exists(ARCHIVE_DIR):
-    for filename in os.listdir(ARCHIVE_DIR):
-        if filename.endswith(".json"):
-            filepath = os.path.join(ARCHIVE_DIR, filename)
-            with open(filepath, 'r', encoding='utf-8') as f:
-                day_data = json.load(f)
-            cleaned_day = [item for item in day_data if not is_stock_garbage(item['title'])]
-            removed_day = len(day_data) - len(cleaned_day)
-            if removed_day > 0:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(cleaned_day, f, ensure_ascii=False, indent=2)
-                print(f"{filename} 删除了 {removed_day} 条股票垃圾")
\ No newline at end of file
+def clean_stock_garbage(dry_run=False, force=False):
+    return run_pipeline(["stock_garbage"], dry_run=dry_run, force=force)
+
+if __name__ == "__main__":
+    clean_stock_garbage(dry_run="--dry-run" in sys.argv, force="--force" in sys.argv)
@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 各脚本共用的状态目录、原子写入、磁盘缓存与线程池
+
+# 跨运行保留的状态文件（翻译/补全缓存、发布清单、RSS 进度、运行指标等），由 Actions cache 持久化
+CACHE_DIR = os.environ.get("CACHE_DIR", ".cache")
+
+def write_atomic(path, data, fsync=False):
+    """
+    先写临时文件再替换，写到一半崩溃时原文件保持完整。data 为 str（按 UTF-8 写入）或 bytes；
+    fsync=True 时替换前先落盘（日志等以该文件为准的数据）
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    if isinstance(data, bytes):
+        f = open(tmp_path, 'wb')
+    else:
+        f = open(tmp_path, 'w', encoding='utf-8')
+    with f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JsonDiskCache:
+    """
+    保存在单个 JSON 文件里的键值缓存（翻译缓存、补全缓存的公共部分）。
+    保存时按最后使用时间淘汰：超过 max_age_days 的先删，再按 LRU 截到 max_entries 条。
+    子类实现 entry_time()（条目的最后使用时间），需要额外字段时覆盖 from_json() / to_json()。
+    """
+
+    label = "缓存"
+
+    def __init__(self, path, max_entries, max_age_days):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.from_json(json.load(f))
+        except Exception as e:
+            print(f"⚠️ {self.label}读取失败，将重新建立: {e}")
+            self.entries = {}
+
+    def from_json(self, data):
+        self.entries = data
+
+    def to_json(self):
+        return self.entries
+
+    def entry_time(self, entry):
+        raise NotImplementedError
+
+    def evict(self):
+        cutoff = time.time() - self.max_age_days * 86400
+        self.entries = {k: v for k, v in self.entries.items() if self.entry_time(v) >= cutoff}
+        if len(self.entries) > self.max_entries:
+            newest = sorted(self.entries.items(), key=lambda kv: self.entry_time(kv[1]), reverse=True)
+            self.entries = dict(newest[:self.max_entries])
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.evict()
+        write_atomic(self.path, json.dumps(self.to_json(), ensure_ascii=False))
+        self.dirty = False
+
+
+# 线程池进程内复用：常驻模式下工作线程（及各自的线程局部状态，如翻译器、HTTP 会话）跨轮次保留
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name, workers):
+    """按用途和线程数取共享线程池，不同用途互不占用线程"""
+    with _pools_lock:
+        key = (name, workers)
+        if key not in _pools:
+            _pools[key] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        return _pools[key]
@@ -0,0 +1,306 @@
+import codecs
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+from common import CACHE_DIR, JsonDiskCache, get_pool
+from metrics import get_metrics
+
+# === 正文页补全配置 (可通过环境变量调整) ===
+# 对新条目各请求一次原文页面，取出出版方原始链接、og:image、og:description
+ENRICH = os.environ.get("ENRICH", "1") != "0"
+ENRICH_WORKERS = int(os.environ.get("ENRICH_WORKERS", "8"))
+# 同一主机的并发上限，避免对单个媒体站点突发请求
+ENRICH_PER_HOST = int(os.environ.get("ENRICH_PER_HOST", "2"))
+# RSS 链接全部在 Google News 上，这一跳单独设上限（默认不低于线程数），否则整个阶段只有 ENRICH_PER_HOST 的并发
+ENRICH_GOOGLE_PER_HOST = int(os.environ.get("ENRICH_GOOGLE_PER_HOST", str(ENRICH_WORKERS)))
+ENRICH_MAX_REDIRECTS = 5
+ENRICH_TIMEOUT = float(os.environ.get("ENRICH_TIMEOUT", "8"))
+# 只读取页面开头这么多字节（<head> 一般远小于此）
+ENRICH_MAX_BYTES = int(os.environ.get("ENRICH_MAX_BYTES", str(256 * 1024)))
+SUMMARY_MAX_CHARS = int(os.environ.get("ENRICH_SUMMARY_MAX_CHARS", "200"))
+USER_AGENT = os.environ.get("ENRICH_USER_AGENT", "Mozilla/5.0 (compatible; JapanNewsBot/1.0)")
+
+# Google News 的跳转链接：落地后仍在这些主机上时，从页面里找出版方链接
+GOOGLE_NEWS_HOSTS = ("news.google.com",)
+
+# === 补全缓存配置 ===
+ENRICH_CACHE_FILE = os.path.join(CACHE_DIR, "enrichment.json")
+ENRICH_CACHE_MAX_ENTRIES = int(os.environ.get("ENRICH_CACHE_MAX_ENTRIES", "20000"))
+ENRICH_CACHE_MAX_AGE_DAYS = int(os.environ.get("ENRICH_CACHE_MAX_AGE_DAYS", "30"))
+# 请求失败的链接隔多久再试
+ENRICH_RETRY_HOURS = float(os.environ.get("ENRICH_RETRY_HOURS", "6"))
+
+
+class HeadMetaParser(HTMLParser):
+    """只收集 <head> 里的 og/twitter 元数据、canonical 链接，以及 Google News 页面里的出版方链接"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.canonical = ""
+        self.data_link = ""    # data-n-au 属性
+        self.anchor_link = ""  # 第一个非 Google 站点的 <a>
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k.lower(): v or "" for k, v in attrs}
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or "").lower()
+            if key and attrs.get("content"):
+                self.meta.setdefault(key, attrs["content"].strip())
+        elif tag == "link" and "canonical" in attrs.get("rel", "").lower().split():
+            self.canonical = self.canonical or attrs.get("href", "")
+        # Google News 中转页把原文链接放在 data-n-au 上，没有时退而取第一个非 Google 站点的 <a>
+        candidate = attrs.get("data-n-au", "")
+        if not self.data_link and candidate.startswith("http") and not is_google_host(candidate):
+            self.data_link = candidate
+        candidate = attrs.get("href", "") if tag == "a" else ""
+        if not self.anchor_link and candidate.startswith("http") and not is_google_host(candidate):
+            self.anchor_link = candidate
+
+    @property
+    def publisher_link(self):
+        return self.data_link or self.anchor_link
+
+
+def is_google_news(url):
+    return (urlparse(url).hostname or "") in GOOGLE_NEWS_HOSTS
+
+def is_google_host(url):
+    """Google 自家的主机（*.google.com、google.co.jp 等，含登录/同意页），不会是出版方"""
+    host = urlparse(url).hostname or ""
+    return (host in GOOGLE_NEWS_HOSTS or host == "google.com" or host.endswith(".google.com")
+            or host.startswith("google.") or ".google." in host)
+
+def parse_page(html, base_url):
+    """从页面开头解析元数据，返回 {url, image, summary}（取不到的字段为空字符串）"""
+    parser = HeadMetaParser()
+    # Google News 中转页的链接在 <body> 里，其它页面只需要 <head>
+    head_end = html.lower().find("</head>")
+    if head_end >= 0 and not is_google_news(base_url):
+        html = html[:head_end]
+    try:
+        parser.feed(html)
+    except Exception:
+        pass
+    meta = parser.meta
+    if is_google_news(base_url):
+        url = parser.publisher_link
+    else:
+        url = meta.get("og:url") or parser.canonical or base_url
+    image = meta.get("og:image") or meta.get("og:image:url") or meta.get("twitter:image") or ""
+    summary = meta.get("og:description") or meta.get("description") or meta.get("twitter:description") or ""
+    summary = " ".join(summary.split())
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = summary[:SUMMARY_MAX_CHARS - 1] + "…"
+    return {
+        "url": urljoin(base_url, url) if url else "",
+        "image": urljoin(base_url, image) if image else "",
+        "summary": summary,
+    }
+
+
+class HostLimiter:
+    """按主机限制并发请求数，多线程共享；overrides 为个别主机单独的上限 {host: n}"""
+
+    def __init__(self, per_host, overrides=None):
+        self.per_host = max(per_host, 1)
+        self.overrides = overrides or {}
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        host = urlparse(url).hostname or ""
+        with self.lock:
+            if host not in self.semaphores:
+                limit = max(self.overrides.get(host, self.per_host), 1)
+                self.semaphores[host] = threading.BoundedSemaphore(limit)
+            return self.semaphores[host]
+
+
+class EnrichmentCache(JsonDiskCache):
+    """
+    磁盘补全缓存：RSS 链接 -> {url, image, summary, ok, t}。
+    成功的结果长期沿用（按最后使用时间淘汰），失败的结果过 ENRICH_RETRY_HOURS 后重试。
+    """
+
+    label = "补全缓存"
+
+    def __init__(self, path=ENRICH_CACHE_FILE, max_entries=ENRICH_CACHE_MAX_ENTRIES,
+                 max_age_days=ENRICH_CACHE_MAX_AGE_DAYS):
+        super().__init__(path, max_entries, max_age_days)
+
+    def entry_time(self, entry):
+        return entry["t"]
+
+    def get(self, link):
+        entry = self.entries.get(link)
+        if entry is None or (not entry["ok"] and time.time() - entry["t"] > ENRICH_RETRY_HOURS * 3600):
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry["ok"]:
+            entry["t"] = int(time.time())
+            self.dirty = True
+        return entry
+
+    def put(self, link, result, ok):
+        self.entries[link] = dict(result, ok=ok, t=int(time.time()))
+        self.dirty = True
+
+
+_cache = None
+
+def get_enrichment_cache():
+    """进程内共享的补全缓存实例"""
+    global _cache
+    if _cache is None:
+        _cache = EnrichmentCache()
+    return _cache
+
+
+# requests.Session 不保证线程安全，每个线程各自持有一份
+_local = threading.local()
+
+def _get_session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        import requests  # 只在真正发请求时导入
+        session = _local.session = requests.Session()
+        session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "ja,en;q=0.8"})
+    return session
+
+_CHARSET = re.compile(rb"""charset\s*=\s*["']?([A-Za-z0-9._:-]+)""", re.I)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([A-Za-z0-9._:-]+)""", re.I)
+
+def _valid_codec(name):
+    try:
+        return codecs.lookup(name.decode("ascii")).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+def detect_encoding(raw, content_type=""):
+    """
+    页面编码：响应头 charset > <meta charset> / http-equiv > charset_normalizer 推测 > utf-8。
+    只用已读取的字节判断（流式读取后不能再访问 resp.apparent_encoding）。
+    """
+    match = _CHARSET.search(content_type.encode("latin-1", errors="ignore"))
+    if match and _valid_codec(match.group(1)):
+        return _valid_codec(match.group(1))
+    match = _META_CHARSET.search(raw[:4096])
+    if match and _valid_codec(match.group(1)):
+        return _valid_codec(match.group(1))
+    try:
+        from charset_normalizer import from_bytes  # requests 的依赖
+        best = from_bytes(raw).best()
+        if best is not None:
+            return best.encoding
+    except ImportError:
+        pass
+    return "utf-8"
+
+def fetch_page(url, limiter, timeout=ENRICH_TIMEOUT, max_bytes=ENRICH_MAX_BYTES):
+    """
+    请求页面并逐跳跟随跳转，每一跳占用的是该跳主机的并发额度（跳转到出版方后按出版方限流）。
+    返回 (落地 URL, 页面开头的文本)
+    """
+    session = _get_session()
+    for _ in range(ENRICH_MAX_REDIRECTS + 1):
+        with limiter.get(url):
+            with session.get(url, timeout=timeout, stream=True, allow_redirects=False) as resp:
+                if resp.is_redirect:
+                    url = urljoin(url, resp.headers["Location"])
+                    continue
+                resp.raise_for_status()
+                content_type = resp.headers.get("Content-Type", "")
+                if "html" not in content_type:
+                    return url, ""
+                chunks = []
+                size = 0
+                for chunk in resp.iter_content(chunk_size=16384):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= max_bytes:
+                        break
+                raw = b"".join(chunks)
+        return url, raw.decode(detect_encoding(raw, content_type), errors="replace")
+    raise RuntimeError(f"跳转超过 {ENRICH_MAX_REDIRECTS} 次")
+
+def enrich_one(link, limiter):
+    """
+    解析一条链接：先跟随跳转拿到出版方页面，仍停在 Google News 时从中转页里找出原文链接再请求一次。
+    返回 ({url, image, summary}, 是否成功)
+    """
+    url, html = fetch_page(link, limiter)
+    if is_google_news(url):
+        publisher_url = parse_page(html, url)["url"]
+        if not publisher_url:
+            return {"url": "", "image": "", "summary": ""}, False
+        url, html = fetch_page(publisher_url, limiter)
+    result = parse_page(html, url)
+    # og:url 偶尔指向站点首页，这时以实际落地的文章地址为准
+    if not result["url"] or urlparse(result["url"]).path in ("", "/"):
+        result["url"] = url
+    return result, True
+
+def enrich_links(links, workers=None, per_host=None, cache=None, enabled=None):
+    """
+    并发补全一组 RSS 链接，每条链接最多请求一次（结果写入磁盘缓存，之后直接复用）。
+    返回与输入顺序一致的 [{url, image, summary}, ...]；失败或关闭时字段为空字符串。
+    """
+    enabled = ENRICH if enabled is None else enabled
+    empty = {"url": "", "image": "", "summary": ""}
+    if not enabled or not links:
+        return [dict(empty) for _ in links]
+    workers = workers or ENRICH_WORKERS
+    limiter = HostLimiter(per_host or ENRICH_PER_HOST,
+                          {host: ENRICH_GOOGLE_PER_HOST for host in GOOGLE_NEWS_HOSTS})
+    cache = cache or get_enrichment_cache()
+
+    results = [None] * len(links)
+    pending = {}  # link -> [下标, ...]，同一链接只请求一次
+    for i, link in enumerate(links):
+        if link in pending:
+            pending[link].append(i)
+            continue
+        cached = cache.get(link)
+        if cached is not None:
+            results[i] = {key: cached.get(key, "") for key in empty}
+        else:
+            pending[link] = [i]
+
+    metrics = get_metrics()
+
+    def work(link):
+        request_start = time.monotonic()
+        try:
+            return enrich_one(link, limiter)
+        except Exception as e:
+            print(f"  [补全失败] {link}: {e}")
+            return dict(empty), False
+        finally:
+            metrics.observe("enrich_request", time.monotonic() - request_start)
+
+    start = time.monotonic()
+    outputs = list(get_pool("enrich", workers).map(work, list(pending)))
+    elapsed = time.monotonic() - start
+
+    failed = 0
+    for (link, indexes), (result, ok) in zip(pending.items(), outputs):
+        cache.put(link, result, ok)
+        failed += not ok
+        for i in indexes:
+            results[i] = result
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = dict(empty)
+    cache.save()
+    metrics.count("enrich_cache_hits", cache.hits)
+    metrics.count("enrich_requests", len(pending))
+    metrics.count("enrich_failures", failed)
+    print(f"正文页补全：缓存命中 {cache.hits}，请求 {len(pending)} 条 (失败 {failed})，"
+          f"耗时 {elapsed:.1f}s (并发 {workers}，每主机 {limiter.per_host})")
+    cache.hits = cache.misses = 0
+    return results
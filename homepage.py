@@ -0,0 +1,123 @@
+import datetime
+import hashlib
+import json
+import os
+from news_core import get_current_jst_time, get_item_title_key
+from publish import dump_json, write_json_if_changed
+
+ARCHIVE_DIR = "public/archive"
+DATA_FILE = "public/data.json"
+# 分片首页：manifest + 首屏 + 续页 + 分类分片，首屏大小与当天新闻量无关
+FEED_DIR = "public/feed"
+HOMEPAGE_DAYS = 2
+FIRST_PAGE_SIZE = int(os.environ.get("FEED_FIRST_PAGE_SIZE", "30"))
+PAGE_SIZE = int(os.environ.get("FEED_PAGE_SIZE", "100"))
+
+# classify_news 的分类 -> 分片文件名（与前端 CATEGORY_MAP 一致）
+CATEGORY_SLUGS = {
+    "时政": "politics",
+    "政治": "politics",
+    "军事": "military",
+    "经济": "economy",
+    "社会": "society",
+    "娱乐": "entertainment",
+    "体育": "sports",
+    "其他": "other",
+}
+
+def build_homepage_news(archive_dir=ARCHIVE_DIR, today=None):
+    """汇总最近两天的存档，按标题去重、按发布时间倒序"""
+    homepage_news = []
+    seen_titles = set()
+    today = today or get_current_jst_time()
+    target_dates = [(today - datetime.timedelta(days=d)).strftime("%Y-%m-%d") for d in range(HOMEPAGE_DAYS)]
+    for date_str in target_dates:
+        path = os.path.join(archive_dir, f"{date_str}.json")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                day_data = json.load(f)
+                for item in day_data:
+                    clean_key = get_item_title_key(item)
+                    if clean_key not in seen_titles:
+                        homepage_news.append(item)
+                        seen_titles.add(clean_key)
+
+    homepage_news.sort(key=lambda x: x['timestamp'], reverse=True)
+    return homepage_news
+
+def write_feed(homepage_news, last_updated, feed_dir=FEED_DIR):
+    """
+    写出分片首页，返回 [(本地路径, R2 key, 字节), ...]：
+      feed/manifest.json        版本号、首屏/续页/分类分片列表
+      feed/first.json           最新 FIRST_PAGE_SIZE 条
+      feed/page-<n>.json        其余条目按 PAGE_SIZE 分页
+      feed/category/<slug>.json 每个分类一份（前端切换分类时直接取该分类的分片，不必等续页下载完）
+    分片内容不变时文件不重写；前端用 manifest 的 version 做缓存键。
+    """
+    os.makedirs(os.path.join(feed_dir, "category"), exist_ok=True)
+    version = hashlib.md5(dump_json(homepage_news)).hexdigest()[:12]
+    outputs = []
+
+    def emit(rel_path, data):
+        path = os.path.join(feed_dir, rel_path)
+        _, body = write_json_if_changed(path, data)
+        outputs.append((path, f"feed/{rel_path}", body))
+        return f"feed/{rel_path}"
+
+    first = emit("first.json", {"news": homepage_news[:FIRST_PAGE_SIZE]})
+
+    pages = []
+    rest = homepage_news[FIRST_PAGE_SIZE:]
+    for n, start in enumerate(range(0, len(rest), PAGE_SIZE), 1):
+        pages.append(emit(f"page-{n}.json", {"news": rest[start:start + PAGE_SIZE]}))
+    # 清理上次多出来的续页
+    for filename in os.listdir(feed_dir):
+        if filename.startswith("page-") and f"feed/{filename}" not in pages:
+            os.remove(os.path.join(feed_dir, filename))
+
+    by_category = {slug: [] for slug in CATEGORY_SLUGS.values()}
+    for item in homepage_news:
+        by_category[CATEGORY_SLUGS.get(item.get('category'), "other")].append(item)
+    categories = {}
+    for slug, items in by_category.items():
+        categories[slug] = {"file": emit(f"category/{slug}.json", {"news": items}), "count": len(items)}
+
+    manifest = {
+        "version": version,
+        "last_updated": last_updated,
+        "total": len(homepage_news),
+        "first": first,
+        "pages": pages,
+        "categories": categories,
+    }
+    # manifest 排在最后，发布时等它引用的分片都上传完再上传它
+    emit("manifest.json", manifest)
+    return outputs
+
+def write_homepage(archive_dir=ARCHIVE_DIR, data_json_path=DATA_FILE, feed_dir=FEED_DIR):
+    """
+    重建首页数据：完整的 data.json（兼容旧前端）+ 分片首页。
+    返回 (homepage_news, [(本地路径, R2 key, 字节), ...])，manifest 排在最后。
+    """
+    homepage_news = build_homepage_news(archive_dir)
+
+    last_updated = get_current_jst_time().strftime("%Y年%m月%d日 %H时%M分")
+    # 新闻列表没变时沿用原来的更新时间，保证 data.json 字节不变、不触发重新上传
+    if os.path.exists(data_json_path):
+        try:
+            with open(data_json_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            if previous.get("news") == homepage_news:
+                last_updated = previous.get("last_updated", last_updated)
+        except Exception as e:
+            print(f"读取旧 data.json 失败: {e}")
+
+    output_data = {
+        "last_updated": last_updated,
+        "news": homepage_news
+    }
+    _, body = write_json_if_changed(data_json_path, output_data)
+
+    outputs = write_feed(homepage_news, last_updated, feed_dir)
+    outputs.insert(-1, (data_json_path, "data.json", body))
+    return homepage_news, outputs
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from common import CACHE_DIR, write_atomic
+
+# 媒体 Logo 镜像：每个域名的 favicon 只下载一次，作为 logos/<域名>.png 发布到 R2，
+# 条目的 logo 字段改为这个相对路径（前端拼上 R2 地址），客户端不再逐个请求 Google favicon 服务
+MIRROR_LOGOS = os.environ.get("MIRROR_LOGOS", "1") != "0"
+LOGO_DIR = "public/logos"
+# 统一尺寸的 PNG，由 favicon 服务按 sz 缩放
+LOGO_SIZE = int(os.environ.get("LOGO_SIZE", "64"))
+LOGO_SOURCE = "https://www.google.com/s2/favicons?domain={domain}&sz={size}"
+LOGO_WORKERS = int(os.environ.get("LOGO_WORKERS", "4"))
+LOGO_TIMEOUT = float(os.environ.get("LOGO_TIMEOUT", "10"))
+# 超过这么多天的 Logo 重新下载；下载失败的域名隔 LOGO_RETRY_HOURS 再试
+LOGO_MAX_AGE_DAYS = int(os.environ.get("LOGO_MAX_AGE_DAYS", "30"))
+LOGO_RETRY_HOURS = float(os.environ.get("LOGO_RETRY_HOURS", "24"))
+
+# 已镜像的域名状态 {域名: {"ok", "t", "md5"}}
+LOGO_STATE_FILE = os.path.join(CACHE_DIR, "logos.json")
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+def favicon_url(domain):
+    """未镜像时的回退地址（原先的做法）"""
+    return f"https://www.google.com/s2/favicons?domain={domain}&sz=128"
+
+def logo_key(domain):
+    return f"logos/{domain}.png"
+
+def load_logo_state(path=LOGO_STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Logo 状态读取失败，将重新建立: {e}")
+        return {}
+
+def save_logo_state(state, path=LOGO_STATE_FILE):
+    write_atomic(path, json.dumps(state, ensure_ascii=False, indent=2, sort_keys=True))
+
+def mirrored_domains(state=None):
+    """已成功镜像的域名集合"""
+    state = load_logo_state() if state is None else state
+    return {domain for domain, entry in state.items() if entry.get("ok")}
+
+def logo_for(domain, mirrored):
+    """条目 logo 字段：已镜像的用 R2 相对路径，否则回退到 favicon 服务"""
+    if not domain:
+        return ""
+    return logo_key(domain) if domain in mirrored else favicon_url(domain)
+
+def is_stale(entry, now=None):
+    now = now or time.time()
+    if entry is None:
+        return True
+    if entry.get("ok"):
+        return now - entry["t"] > LOGO_MAX_AGE_DAYS * 86400
+    return now - entry["t"] > LOGO_RETRY_HOURS * 3600
+
+def failed_entry(previous, now):
+    """下载或上传失败：之前镜像成功的保留原图，只推迟下次刷新；否则隔 LOGO_RETRY_HOURS 再试"""
+    previous = previous or {}
+    return dict(previous, t=int(now)) if previous.get("ok") else {"ok": False, "t": int(now)}
+
+def fetch_logo(domain):
+    """下载一个域名的 favicon，返回 PNG 字节；不是 PNG（如 404 页面）时抛出异常"""
+    import requests  # 只在真正下载时导入
+    resp = requests.get(LOGO_SOURCE.format(domain=domain, size=LOGO_SIZE), timeout=LOGO_TIMEOUT)
+    resp.raise_for_status()
+    if not resp.content.startswith(PNG_MAGIC):
+        raise ValueError(f"不是 PNG ({resp.headers.get('Content-Type', '')})")
+    return resp.content
+
+def mirror_logos(domains, publisher=None, logo_dir=LOGO_DIR, state_path=LOGO_STATE_FILE):
+    """
+    只下载新出现或过期的域名 Logo，写入 logo_dir 并经 publisher 立即上传（会 flush 其队列），
+    上传成功（或 R2 上已有相同内容）的才记为已镜像；没有 publisher 或上传凭证时不记。
+    返回已镜像的域名集合；MIRROR_LOGOS=0 时不下载，返回空集合（全部回退到 favicon 服务）。
+    """
+    if not MIRROR_LOGOS:
+        return set()
+
+    state = load_logo_state(state_path)
+    now = time.time()
+    stale = sorted({d for d in domains if d and is_stale(state.get(d), now)})
+    if not stale:
+        return mirrored_domains(state)
+
+    def work(domain):
+        try:
+            return fetch_logo(domain), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(LOGO_WORKERS, len(stale)))) as pool:
+        results = list(pool.map(work, stale))
+
+    os.makedirs(logo_dir, exist_ok=True)
+    uploading = publisher is not None and publisher.client is not None
+    fetched = 0
+    downloaded = {}  # 域名 -> 新状态，上传确认后才记为已镜像
+    queued = set()
+    for domain, (body, error) in zip(stale, results):
+        if body is None:
+            print(f"  [Logo 下载失败] {domain}: {error}")
+            state[domain] = failed_entry(state.get(domain), now)
+            continue
+        fetched += 1
+        path = os.path.join(logo_dir, f"{domain}.png")
+        with open(path, 'wb') as f:
+            f.write(body)
+        downloaded[domain] = {"ok": True, "t": int(now), "md5": hashlib.md5(body).hexdigest()}
+        # publish 返回 False 表示 R2 上已是同样的内容，无需上传
+        if uploading and publisher.publish(path, logo_key(domain), body):
+            queued.add(domain)
+
+    # 条目要改写成 logos/<域名>.png，必须先确认对象已在 R2 上：这里就上传，成功的才记为已镜像
+    uploaded = {}
+    if queued:
+        uploaded = {result["key"]: result["ok"] for result in publisher.flush()}
+    for domain, entry in downloaded.items():
+        if uploading and (domain not in queued or uploaded.get(logo_key(domain))):
+            state[domain] = entry
+        else:
+            # 没有上传凭证或上传失败
+            state[domain] = failed_entry(state.get(domain), now)
+            fetched -= 1
+
+    save_logo_state(state, state_path)
+    print(f"Logo 镜像：刷新 {len(stale)} 个域名，成功 {fetched} 个，已镜像共 {len(mirrored_domains(state))} 个")
+    return mirrored_domains(state)
+
+if __name__ == "__main__":
+    # python logo_cache.py    为映射表中的全部媒体和存档中出现过的域名预先镜像 Logo 并上传
+    from archive_store import get_store
+    from news_core import MEDIA_DOMAIN_MAP, resolve_logo_domain
+    from publish import Publisher, get_r2_client
+
+    store = get_store()
+    domains = set(MEDIA_DOMAIN_MAP.values())
+    for date_str in store.dates():
+        for item in store.iter_day(date_str):
+            domains.add(resolve_logo_domain(item.get("origin"), item.get("link")))
+    publisher = Publisher(get_r2_client())
+    mirror_logos(domains, publisher)
+    publisher.save()
+    publisher.report()
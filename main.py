@@ -1,197 +1,30 @@
-import feedparser
 import calendar
-from deep_translator import GoogleTranslator
 import json
 import os
+import sys
 import datetime
 import time
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-import boto3
-from botocore.config import Config
-
-# 日本时间 (UTC+9)
-JST = datetime.timezone(datetime.timedelta(hours=9))
-
-# === R2 配置 ===
-R2_ACCOUNT_ID = os.environ.get("CLOUDFLARE_ACCOUNT_ID", "")
-R2_ACCESS_KEY = os.environ.get("CLOUDFLARE_R2_ACCESS_KEY_ID", "")
-R2_SECRET_KEY = os.environ.get("CLOUDFLARE_R2_SECRET_ACCESS_KEY", "")
-R2_BUCKET_NAME = os.environ.get("R2_BUCKET_NAME", "cnjp-data")
-
-def get_r2_client():
-    """获取 R2 客户端"""
-    if not R2_ACCOUNT_ID or not R2_ACCESS_KEY or not R2_SECRET_KEY:
-        print("⚠️ R2 credentials not configured, skipping R2 upload")
-        return None
-    
-    return boto3.client(
-        's3',
-        endpoint_url=f'https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com',
-        aws_access_key_id=R2_ACCESS_KEY,
-        aws_secret_access_key=R2_SECRET_KEY,
-        config=Config(signature_version='s3v4'),
-        region_name='auto'
-    )
-
-def upload_to_r2(client, local_path, r2_key):
-    """上传文件到 R2"""
-    if client is None:
-        return False
-    try:
-        with open(local_path, 'rb') as f:
-            client.put_object(
-                Bucket=R2_BUCKET_NAME,
-                Key=r2_key,
-                Body=f.read(),
-                ContentType='application/json'
-            )
-        print(f"✅ Uploaded to R2: {r2_key}")
-        return True
-    except Exception as e:
-        print(f"❌ R2 upload failed for {r2_key}: {e}")
-        return False
-
-# === 媒体映射表 ===
-MEDIA_DOMAIN_MAP = {
-    "Yahoo": "news.yahoo.co.jp",
-    "雅虎": "news.yahoo.co.jp",
-    "日本経済新聞": "www.nikkei.com",
-    "日経": "www.nikkei.com",
-    "Nikkei": "www.nikkei.com",
-    "NHK": "www3.nhk.or.jp",
-    "TBS": "newsdig.tbs.co.jp",
-    "JNN": "newsdig.tbs.co.jp",
-    "FNN": "www.fnn.jp",
-    "フジテレビ": "www.fnn.jp",
-    "富士": "www.fnn.jp",
-    "日テレ": "news.ntv.co.jp",
-    "日本テレビ": "news.ntv.co.jp",
-    "NNN": "news.ntv.co.jp",
-    "テレ朝": "news.tv-asahi.co.jp",
-    "テレビ朝日": "news.tv-asahi.co.jp",
-    "ANN": "news.tv-asahi.co.jp",
-    "毎日新聞": "mainichi.jp",
-    "朝日新聞": "www.asahi.com",
-    "読売新聞": "www.yomiuri.co.jp",
-    "産経": "www.sankei.com",
-    "Sankei": "www.sankei.com",
-    "共同": "www.kyodo.co.jp",
-    "Kyodo": "www.kyodo.co.jp",
-    "時事": "www.jiji.com",
-    "Jiji": "www.jiji.com",
-    "東洋経済": "toyokeizai.net",
-    "現代ビジネス": "gendai.media",
-    "Diamond": "diamond.jp",
-    "ダイヤモンド": "diamond.jp",
-    "JBpress": "jbpress.ismedia.jp",
-    "Newsweek": "www.newsweekjapan.jp",
-    "CNN": "www.cnn.co.jp",
-    "BBC": "www.bbc.com",
-    "Bloomberg": "www.bloomberg.co.jp",
-    "Reuters": "jp.reuters.com",
-    "路透": "jp.reuters.com",
-    "Record China": "www.recordchina.co.jp",
-    "サーチナ": "searchina.net",
-    "北海道新聞": "www.hokkaido-np.co.jp",
-    "東京新聞": "www.tokyo-np.co.jp",
-    "西日本新聞": "www.nishinippon.co.jp",
-    "中日新聞": "www.chunichi.co.jp",
-    "沖縄タイムス": "www.okinawatimes.co.jp",
-    "琉球新報": "ryukyushimpo.jp"
-}
-
-# === 1. 假新闻过滤名单 ===
-IGNORE_KEYWORDS = [
-    "中国地方", "中国地区", "中国５県", "中国五県",
-    "中国電力", "中国電", "中電",
-    "中国銀行", "中国銀",
-    "中国道", "中国自動車道",
-    "中国運輸局", "中国整備局", "中国経産局",
-    "中国新人", "中国大会", "中国リーグ",
-    "中国バス", "中国ジェイアール",
-    "鳥取", "島根", "岡山", "広島", "山口"
-]
-# 白名单 (有这些词的就算有干扰词也不删)
-WHITELIST_KEYWORDS = [
-    "北京", "上海", "深圳", "香港", "台湾", "習近平", "李強", "共産党", "中共", 
-    "人民元", "外交部", "領事館", "総領事", "中国政府", "日中", "中日", "GDP",
-    "EV", "不動産", "軍", "ミサイル", "台湾有事", "尖閣"
-]
-
-def is_false_positive(title, source_name):
-    # 针对"中国新闻(Chugoku Shimbun)"媒体
-    if "中国新聞" in source_name:
-        if not any(wk in title for wk in WHITELIST_KEYWORDS):
-            return True
-    # 检查标题
-    for kw in IGNORE_KEYWORDS:
-        if kw in title:
-            if any(wk in title for wk in WHITELIST_KEYWORDS):
-                return False 
-            return True
-    return False
-
-# === 2. 新的分类逻辑 (无科技，有军事) ===
-def classify_news(title):
-    keywords = {
-        "军事": [
-            "军事", "国防", "军", "军队", "解放军", "核武器", "导弹", "演习", "训练", 
-            "巡逻", "海警", "海警局", "钓鱼岛", "尖阁", "南海", "东海", "台海", 
-            "航母", "战斗机", "战机", "舰艇", "潜艇", "驱逐舰", "轰炸机", "侦察机",
-            "入侵", "领空", "领海", "雷达", "部队", "战备", "武力", "威慑"
-        ],
-        "经济": [
-            "经济", "贸易", "股市", "投资", "银行", "企业", "GDP", "市场", "消费", "产业", 
-            "汇率", "美元", "日元", "通胀", "物价", "工资", "就业", "失业", "房地产", "楼市", 
-            "央行", "利率", "加息", "降息", "关税", "出口", "进口", "供应链", "制造", "财报", 
-            "亏损", "盈利", "收购", "合并", "破产", "裁员",
-            # 原科技词汇并入经济
-            "科技", "技术", "研发", "AI", "人工智能", "芯片", "半导体", "电动车", "EV", "比亚迪", 
-            "宁德时代", "华为", "腾讯", "阿里", "字节", "TikTok", "百度", "丰田", "本田", "日产", 
-            "索尼", "松下", "软银", "5G", "6G", "互联网", "机器人", "无人机", "手机", "智能",
-            "太空", "宇宙", "卫星", "火箭", "嫦娥", "神舟", "空间站"
-        ],
-        "社会": [
-            "社会", "人口", "教育", "医疗", "犯罪", "事故", "灾害", "疫情", "感染", "新冠", 
-            "生活", "旅游", "签证", "移民", "少子化", "老龄化", "养老", "福利", "保险", 
-            "医院", "学校", "学生", "老师", "大学", "高考", "留学", "治安", "警察", "逮捕", 
-            "审判", "法院", "律师", "死刑", "地震", "台风", "暴雨", "洪水", "火灾", 
-            "交通", "铁路", "新干线", "航班", "机场", "地铁", "公交", "食品", "安全", 
-            "环境", "污染", "垃圾", "气候", "变暖", "碳中和", "核电", "核污水", "排海", "靖国神社", "熊猫"
-        ],
-        "体育": [
-            "体育", "奥运", "足球", "篮球", "棒球", "选手", "比赛", "冠军", "大谷", "翔平", 
-            "羽生", "结弦", "乒乓", "网球", "游泳", "田径", "马拉松", "相扑", "柔道", 
-            "世界杯", "亚洲杯", "亚运会", "联赛", "俱乐部", "球队", "金牌"
-        ],
-        "娱乐": [
-            "娱乐", "电影", "音乐", "动漫", "电视剧", "明星", "偶像", "演唱会", "综艺", 
-            "声优", "吉卜力", "鬼灭", "海贼王", "进击的巨人", "AKB", "乃木坂", "杰尼斯", 
-            "游戏", "黑神话", "原神", "任天堂"
-        ],
-        "时政": [
-            "政府", "政策", "习近平", "李强", "外交", "政治", "选举", "议员", "首相", "总统", 
-            "中共", "党", "人权", "制裁", "大使", "领事", "条约", "协定", "峰会", "会谈", 
-            "大臣", "内阁", "国会", "参议院", "众议院", "自民党", "拜登", "特朗普", "普京", 
-            "岸田", "石破", "高市", "关系", "互访"
-        ]
-    }
-    
-    priority_order = ["军事", "体育", "娱乐", "社会", "经济", "时政"]
-    
-    for cat in priority_order:
-        if any(w in title for w in keywords[cat]):
-            return cat
-    return "其他"
-
-def get_current_jst_time():
-    return datetime.datetime.now(JST)
+from concurrent.futures import ThreadPoolExecutor
+from translation import translate_titles
+from enrichment import enrich_links
+from zh_convert import to_traditional, use_local_tc
+from archive_index import update_index
+from publish import Publisher, get_r2_client
+from archive_store import get_store
+from news_core import (JST, RULES_FINGERPRINT, classify_news, get_clean_title_key, get_item_title_key,
+                       is_false_positive, resolve_logo_domain)
+from logo_cache import logo_for, mirror_logos
+from homepage import write_homepage
+from near_dup import NEAR_DUP_DAYS, NearDupIndex, add_alt_source
+from search_index import has_search_index, rebuild_search_index, update_search_index
+from metrics import get_metrics, instrumented
+from common import CACHE_DIR, write_atomic
 
 def extract_image(entry):
     content = entry.get('summary', '') or entry.get('description', '') or ''
     if content:
         try:
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(content, 'html.parser')
             img = soup.find('img')
             if img and img.get('src'):
@@ -200,62 +33,257 @@ def extract_image(entry):
             pass
     return ""
 
-def get_source_logo(entry):
-    if hasattr(entry, 'source') and 'title' in entry.source:
-        origin_name = entry.source['title']
-        for key, domain in MEDIA_DOMAIN_MAP.items():
-            if key in origin_name:
-                return f"https://www.google.com/s2/favicons?domain={domain}&sz=128"
+def get_source_domain(entry):
+    """条目来源媒体的域名（取 Logo 用）：先查映射表，再用 RSS 里的来源网址"""
+    source = entry.get('source') or {}
+    return resolve_logo_domain(source.get('title'), source.get('href', ""))
+
+# Google News RSS 检索：单次检索最多返回约 100 条，繁忙时段会漏掉新闻，
+# 因此拆成多个检索分片（全量 / 最近一小时 / 按媒体 / 关键词变体）并发抓取后合并去重
+FEED_BASE = "https://news.google.com/rss/search?q={query}&hl=ja&gl=JP&ceid=JP:ja"
+# 排除地区名“中国地方”等误报，附加在每个分片的检索词后
+FEED_EXCLUDES = "-中国地方 -中国電力 -中国銀行 -中国道 -中国新人 -中国大会"
+# 分片名 -> 检索词
+FEED_QUERIES = {
+    "all": "中国",
+    "hour": "中国 when:1h",
+    "nikkei": "中国 site:nikkei.com",
+    "kyodo": "中国 site:kyodo.co.jp",
+    "nhk": "中国 site:nhk.or.jp",
+    "yahoo": "中国 site:news.yahoo.co.jp",
+    "xi": "習近平",
+    "pla": "中国軍 OR 人民解放軍",
+}
+# 启用的分片（逗号分隔），默认全部
+FEED_SHARDS = [name for name in os.environ.get("FEED_SHARDS", ",".join(FEED_QUERIES)).split(",") if name]
+FEED_WORKERS = int(os.environ.get("FEED_WORKERS", "4"))
+# RSS 条件请求状态：各分片的 ETag / Last-Modified、已处理到的最新发布时间 (watermark)
+FEED_STATE_FILE = os.path.join(CACHE_DIR, "feed_state.json")
+# 设为 1 时忽略条件请求和 watermark，强制完整处理
+FORCE_FETCH = os.environ.get("FORCE_FETCH", "0") == "1"
+
+def get_feed_url(name):
+    return FEED_BASE.format(query=f"{FEED_QUERIES[name]} {FEED_EXCLUDES}".replace(" ", "+"))
+
+def load_feed_state():
+    if FORCE_FETCH or not os.path.exists(FEED_STATE_FILE):
+        return {}
     try:
-        if hasattr(entry, 'source') and 'href' in entry.source:
-            domain_url = entry.source['href']
-            domain = urlparse(domain_url).netloc
-            if "google" not in domain:
-                return f"https://www.google.com/s2/favicons?domain={domain}&sz=128"
-    except:
-        pass
-    return ""
+        with open(FEED_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ 读取 RSS 状态失败: {e}")
+        return {}
+
+def save_feed_state(state):
+    write_atomic(FEED_STATE_FILE, json.dumps(state, ensure_ascii=False, indent=2))
+
+class FeedFetchError(RuntimeError):
+    """RSS 分片抓取失败（全部失败时由 fetch_all_china_news 抛出；常驻模式下部分失败也抛出）"""
+
+def fetch_feed_shard(name, shard_state):
+    """
+    抓取一个检索分片，发送条件请求并把新的 etag/modified 写回 shard_state。
+    返回 (条目列表, 耗时秒数)；服务器返回 304 时条目列表为 None。
+    """
+    import feedparser  # 导入较慢，首次抓取时才导入
+    start = time.monotonic()
+    feed = feedparser.parse(
+        get_feed_url(name),
+        etag=shard_state.get("etag"),
+        modified=shard_state.get("modified")
+    )
+    elapsed = time.monotonic() - start
+    if getattr(feed, 'status', None) == 304:
+        return None, elapsed
+    if getattr(feed, 'etag', None):
+        shard_state["etag"] = feed.etag
+    if getattr(feed, 'modified', None):
+        shard_state["modified"] = feed.modified
+    if getattr(feed, 'bozo', False) and not feed.entries:
+        raise RuntimeError(f"RSS 解析失败: {getattr(feed, 'bozo_exception', '')}")
+    return [e for e in feed.entries if getattr(e, 'published_parsed', None)], elapsed
 
-def fetch_all_china_news():
+def fetch_all_china_news(feed_state=None, shards=None):
+    """
+    并发抓取各检索分片，合并为按发布时间倒序的一个列表，按链接和标题 key 去重（保留较新的一条）。
+    传入 feed_state 时各分片发送条件请求，新的 etag/modified 写回 feed_state["shards"]。
+    返回 (条目列表, 失败的分片名列表)；所有分片都返回 304 时条目列表为 None，
+    所有分片都失败时抛出 FeedFetchError（不能当作“没有新闻”跳过）。
+    """
     print("正在抓取全部最新日本媒体中国新闻...")
-    # 新的RSS URL，包含排除参数
-    url = "https://news.google.com/rss/search?q=中国+-中国地方+-中国電力+-中国銀行+-中国道+-中国新人+-中国大会&hl=ja&gl=JP&ceid=JP:ja"
-    feed = feedparser.parse(url)
-    entries = []
-    for entry in feed.entries:
-        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-            pub_time = calendar.timegm(entry.published_parsed)
-            entries.append((pub_time, entry))
-    entries.sort(key=lambda x: x[0], reverse=True)
-    print(f"本次从 RSS 抓到 {len(entries)} 条新闻")
-    return [e[1] for e in entries]
-
-def get_clean_title_key(full_title):
-    if not full_title:
-        return ""
-    if " - " in full_title:
-        return full_title.rsplit(" - ", 1)[0].strip()
-    return full_title.strip()
-
-def update_news():
-    new_entries = fetch_all_china_news()
+    feed_state = feed_state if feed_state is not None else {}
+    # 旧版单一检索的 etag/modified 不再使用
+    feed_state.pop("etag", None)
+    feed_state.pop("modified", None)
+    shard_states = feed_state.setdefault("shards", {})
+    shards = [name for name in (shards or FEED_SHARDS) if name in FEED_QUERIES]
+
+    def work(name):
+        try:
+            return fetch_feed_shard(name, shard_states.setdefault(name, {})), None
+        except Exception as e:
+            return (None, 0.0), e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(FEED_WORKERS, len(shards)))) as pool:
+        results = list(pool.map(work, shards))
+
+    if all(entries is None and error is None for (entries, _), error in results):
+        print(f"RSS 未更新 (全部 {len(shards)} 个分片 304 Not Modified)")
+        return None, []
+
+    # 按分片顺序收集，记下每个条目最先来自哪个分片
+    tagged = []
+    for order, (name, ((entries, _), _)) in enumerate(zip(shards, results)):
+        for entry in entries or []:
+            tagged.append((calendar.timegm(entry.published_parsed), order, entry))
+    tagged.sort(key=lambda x: (-x[0], x[1]))
+
+    merged = []
+    owner = {}  # 链接 / 标题 key -> 合并结果中的下标
+    sources = []  # 每条合并结果出现在哪些分片中
+    found = {name: 0 for name in shards}
+    for _, order, entry in tagged:
+        found[shards[order]] += 1
+        key = get_clean_title_key(entry.title)
+        index = owner.get(entry.link, owner.get(key))
+        if index is None:
+            index = len(merged)
+            merged.append(entry)
+            sources.append(set())
+            owner[entry.link] = owner[key] = index
+        sources[index].add(shards[order])
+    unique = {name: 0 for name in shards}
+    for names in sources:
+        if len(names) == 1:
+            unique[next(iter(names))] += 1
+
+    # 各分片的产出与耗时：“独有”为只有该分片抓到的条数，用于权衡覆盖面与抓取成本
+    metrics = get_metrics()
+    for name, ((entries, elapsed), error) in zip(shards, results):
+        metrics.observe("feed_request", elapsed)
+        if error is not None:
+            metrics.count("feed_failures")
+            status = f"失败 ({error})"
+        elif entries is None:
+            metrics.count("feed_not_modified")
+            status = "304 未更新"
+        else:
+            status = f"{found[name]} 条，独有 {unique[name]} 条"
+        print(f"  [RSS 分片 {name}] {status}，耗时 {elapsed:.2f}s")
+    failed = [name for name, (_, error) in zip(shards, results) if error is not None]
+    if shards and len(failed) == len(shards):
+        raise FeedFetchError(f"全部 {len(shards)} 个 RSS 分片抓取失败: {results[0][1]}")
+    print(f"本次从 RSS 抓到 {len(merged)} 条新闻（{len(shards)} 个分片共 {len(tagged)} 条，去重后合并）")
+    return merged, failed
+
+def check_failed_shards(failed, strict):
+    """部分分片抓取失败：单次运行只提示（其余分片照常处理）；strict（常驻模式）时抛出，让调度器退避重试"""
+    if not failed:
+        return
+    message = f"{len(failed)} 个 RSS 分片抓取失败: {', '.join(failed)}"
+    if strict:
+        raise FeedFetchError(message)
+    print(f"⚠️ {message}")
+
+def get_entry_date(entry):
+    timestamp = calendar.timegm(entry.published_parsed)
+    return datetime.datetime.fromtimestamp(timestamp, JST).strftime("%Y-%m-%d")
+
+def load_archive_days(store, dates):
+    """读取指定日期的存档，返回 {date: [item, ...]}（不存在的为空列表）"""
+    return {date_key: store.load_day(date_key) for date_key in dates}
+
+def get_window_dates(dates, days=NEAR_DUP_DAYS):
+    """每个日期及其之前 days-1 天，即近似去重需要比对的存档日期"""
+    window = set()
+    for date_key in dates:
+        day = datetime.date.fromisoformat(date_key)
+        window.update((day - datetime.timedelta(days=d)).isoformat() for d in range(days))
+    return sorted(window)
+
+def build_near_dup_index(days):
+    """用最近几天的存档标题建立近似重复索引，关联对象为 (日期, 存档条目)"""
+    index = NearDupIndex()
+    for date_key, items in days.items():
+        for item in items:
+            index.add(item.get('title_ja') or item.get('original_title') or "", (date_key, item))
+    return index
+
+def build_link_index(days):
+    """RSS 链接 -> (日期, 存档条目)，用于识别标题或来源被改过的已存档新闻"""
+    by_link = {}
+    for date_key, items in days.items():
+        for item in items:
+            by_link[item.get('feed_link') or item.get('link')] = (date_key, item)
+    return by_link
+
+def build_known_index(days):
+    """(clean title key, RSS 链接) -> 存档条目，用于在翻译前识别已知新闻"""
+    known = {}
+    for items in days.values():
+        for item in items:
+            # link 已替换为出版方原始链接的条目，用 feed_link 对应 RSS 里的链接
+            known[(get_item_title_key(item), item.get('feed_link') or item.get('link'))] = item
+    return known
+
+@instrumented("update_news")
+def update_news(strict_feeds=False):
+    """
+    抓取、翻译、合并存档并发布一轮；返回本轮新处理的条目数（跳过时为 0）。
+    全部 RSS 分片失败时抛出 FeedFetchError；strict_feeds=True 时部分失败也在本轮处理完后抛出。
+    """
+    # 各阶段耗时与条数记入运行报告（见 metrics.py）
+    metrics = get_metrics()
+    metrics.begin("fetch")
+    feed_state = load_feed_state()
+    new_entries, failed_shards = fetch_all_china_news(feed_state)
+    metrics.count("entries", len(new_entries or []), stage="fetch")
+    if new_entries is None:
+        save_feed_state(feed_state)
+        print("没有新内容，本次跳过。")
+        return 0
+
+    # 没有比上次 watermark 更新的条目时，整条流水线（翻译/合并/索引/上传）都可跳过
+    watermark = feed_state.get("watermark", 0)
+    newest = max((calendar.timegm(e.published_parsed) for e in new_entries), default=0)
+    if newest <= watermark:
+        save_feed_state(feed_state)
+        print(f"没有晚于上次处理进度的新闻 (watermark {watermark})，本次跳过。")
+        check_failed_shards(failed_shards, strict_feeds)
+        return 0
     
+    metrics.begin("filter")
     news_by_date = {}
     preview_items = []
     
-    translator_sc = GoogleTranslator(source='ja', target='zh-CN')
-    translator_tc = GoogleTranslator(source='ja', target='zh-TW')
-    
     print("开始处理并翻译新闻...")
     
     valid_count = 0
     filtered_count = 0
+    known_count = 0
     
     # 记录本次抓取的时间戳
     current_fetch_time = int(time.time())
 
-    for i, entry in enumerate(new_entries):
-        link = entry.link
+    archive_dir = "public/archive"
+    os.makedirs(archive_dir, exist_ok=True)
+
+    # 预读 RSS 覆盖到的日期（及近似去重窗口内）的存档，建立已知条目索引和近似重复索引
+    feed_dates = sorted({get_entry_date(entry) for entry in new_entries})
+    store = get_store(archive_dir)
+    existing_by_date = load_archive_days(store, get_window_dates(feed_dates))
+    known_index = build_known_index(existing_by_date)
+    link_index = build_link_index(existing_by_date)
+    near_dup_index = build_near_dup_index(existing_by_date)
+    near_dup_count = 0
+    revised_count = 0
+    # 被挂上转载来源的存档条目 {date: [item, ...]}，保存时作为修改记录
+    alt_updated = {}
+
+    # 先过滤、剔除已知条目，再把需要翻译的标题一次性交给并发翻译阶段
+    kept_entries = []
+    for entry in new_entries:
         title_ja = entry.title
         source_title = entry.source.title if hasattr(entry, 'source') else ""
 
@@ -266,35 +294,95 @@ def update_news():
             continue
         # ==================
 
-        if i > 0 and i % 10 == 0:
-            print(f"已处理 {i} 条，休息 1 秒...")
-            time.sleep(1)
+        # 已存档且标题、来源未变：直接沿用存档字段，不再翻译/解析
+        known_item = known_index.get((get_clean_title_key(title_ja), entry.link))
+        if known_item and known_item.get('title_ja') == title_ja and known_item.get('origin') == source_title:
+            news_by_date.setdefault(get_entry_date(entry), []).append(dict(known_item))
+            known_count += 1
+            valid_count += 1
+            continue
 
-        try:
-            title_zh = translator_sc.translate(title_ja)
-        except Exception as e:
-            print(f"简体翻译失败: {e}")
-            title_zh = title_ja
-        try:
-            title_tc = translator_tc.translate(title_ja)
-        except Exception as e:
-            print(f"繁体翻译失败: {e}")
-            title_tc = title_ja
+        # 同一链接但标题或来源被改过：作为该存档条目的更新重新处理（不能当成它自己的转载）
+        previous = link_index.get(entry.link)
+        if previous is not None:
+            revised_count += 1
+            alt_sources = []
+            near_dup_index.add(title_ja, ("new", alt_sources))
+            kept_entries.append((entry, source_title, alt_sources, previous))
+            continue
+
+        # 转载/改写的同一报道：挂到代表条目的 alt_sources 上，不单独翻译和存档
+        canonical, score = near_dup_index.find(title_ja)
+        if canonical is not None:
+            near_dup_count += 1
+            if canonical[0] == "new":
+                canonical[1].append((title_ja, entry.link, source_title))
+            elif add_alt_source(canonical[1], title_ja, entry.link, source_title):
+                # 存档里的代表条目被修改，确保该日存档会重新写出
+                news_by_date.setdefault(canonical[0], [])
+                alt_updated.setdefault(canonical[0], []).append(canonical[1])
+            continue
+
+        alt_sources = []
+        near_dup_index.add(title_ja, ("new", alt_sources))
+        kept_entries.append((entry, source_title, alt_sources, None))
+
+    print(f"已知条目 {known_count} 条直接沿用存档，近似重复 {near_dup_count} 条并入代表条目，"
+          f"需处理新条目 {len(kept_entries)} 条（其中标题/来源有改动的已存档条目 {revised_count} 条）")
+    metrics.count("filtered", filtered_count, stage="filter")
+    metrics.count("known", known_count, stage="filter")
+    metrics.count("near_dup", near_dup_count, stage="filter")
+    metrics.count("kept", len(kept_entries), stage="filter")
+    metrics.count("revised", revised_count, stage="filter")
+
+    # 获取 R2 客户端；内容未变化的对象不会重复上传
+    publisher = Publisher(get_r2_client())
+
+    # 繁体标题：默认由简体译文本地转换，TC_MODE=network 时再请求一次 zh-TW 翻译
+    local_tc = use_local_tc()
+    targets = ("zh-CN",) if local_tc else ("zh-CN", "zh-TW")
+    metrics.begin("translate")
+    translated = translate_titles([entry.title for entry, _, _, _ in kept_entries], targets=targets)
+    metrics.count("titles", len(kept_entries) * len(targets), stage="translate")
+    # 出版方原始链接、og:image、og:description（每条链接只请求一次，结果有磁盘缓存）
+    metrics.begin("enrich")
+    enriched = enrich_links([entry.link for entry, _, _, _ in kept_entries])
+    metrics.count("links", len(kept_entries), stage="enrich")
+    # 新出现或过期的媒体 Logo 镜像到 R2（当场上传，确认上传成功的才改写条目 logo）
+    metrics.begin("logos")
+    logo_domains = [get_source_domain(entry) for entry, _, _, _ in kept_entries]
+    mirrored = mirror_logos(logo_domains, publisher)
+    metrics.count("domains", len(set(logo_domains)), stage="logos")
+
+    metrics.begin("build")
+    # 被新版本取代的存档条目 {date: [(旧条目, 新条目), ...]}，新条目写入存档后才删除旧条目
+    revised = {}
+    for i, (entry, source_title, alt_sources, previous) in enumerate(kept_entries):
+        page = enriched[i]
+        link = page["url"] or entry.link
+        title_ja = entry.title
+        title_zh = translated["zh-CN"][i]
+        if not local_tc:
+            title_tc = translated["zh-TW"][i]
+        elif title_zh == title_ja:
+            title_tc = title_ja  # 简体翻译失败，繁体同样回退原文
+        else:
+            title_tc = to_traditional(title_zh)
         
         timestamp = calendar.timegm(entry.published_parsed)
         news_datetime = datetime.datetime.fromtimestamp(timestamp, JST)
         news_date_str = news_datetime.strftime("%Y-%m-%d")
         time_str = news_datetime.strftime("%m-%d %H:%M")
-        logo_url = get_source_logo(entry)
+        logo_url = logo_for(logo_domains[i], mirrored)
 
         news_item = {
             "title": title_zh,
             "title_tc": title_tc,
             "title_ja": title_ja,
             "link": link,
-            "image": extract_image(entry),
+            "image": page["image"] or extract_image(entry),
             "logo": logo_url,
-            "summary": "",
+            "summary": page["summary"],
             # 使用新的分类逻辑
             "category": classify_news(title_zh),
             "time_str": time_str,
@@ -302,6 +390,18 @@ def update_news():
             "fetched_at": current_fetch_time,  # 抓取时间戳，用于按抓取顺序排序
             "origin": source_title
         }
+        if link != entry.link:
+            news_item["feed_link"] = entry.link
+        for alt_title, alt_link, alt_origin in alt_sources:
+            add_alt_source(news_item, alt_title, alt_link, alt_origin)
+        if previous is not None:
+            previous_date, previous_item = previous
+            # 沿用首次抓取时间和已挂上的转载来源
+            news_item["fetched_at"] = previous_item.get("fetched_at") or current_fetch_time
+            for alt in previous_item.get('alt_sources', []):
+                add_alt_source(news_item, alt['title_ja'], alt['link'], alt['origin'])
+            revised.setdefault(previous_date, []).append((previous_item, news_item))
+            news_by_date.setdefault(previous_date, [])
         
         if news_date_str not in news_by_date:
             news_by_date[news_date_str] = []
@@ -313,30 +413,33 @@ def update_news():
         valid_count += 1
 
     print(f"抓取处理结束：有效 {valid_count} 条，过滤 {filtered_count} 条。")
+    metrics.count("items", len(kept_entries), stage="build")
 
     # Archive 更新
-    archive_dir = "public/archive"
-    os.makedirs(archive_dir, exist_ok=True)
-    
+    metrics.begin("merge")
     total_updated = 0
     total_added = 0
     total_ignored = 0
+    total_unchanged = 0
+    total_revised = 0
+    skipped_writes = 0
 
-    # 获取 R2 客户端
-    r2_client = get_r2_client()
-    uploaded_archives = []
+    touched_days = {}
+    search_changes = {}
 
+    # 第一遍：把新条目合并进各日存档；新条目可能和被取代的旧版本不在同一天，删除要等全部合并完
+    merged_days = {}
+    accepted = set()  # 实际写入存档的新条目 id
     for date_key, items in news_by_date.items():
-        file_path = os.path.join(archive_dir, f"{date_key}.json")
-        existing_list = []
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                existing_list = json.load(f)
+        existing_list = existing_by_date.get(date_key, [])
+        # 合并前的快照，用于检索索引比较新旧词项
+        before_list = [dict(item) for item in existing_list]
+        # 相对已有存档新增或修改的条目（jsonl 模式下只追加这些记录）
+        upserts = list(alt_updated.get(date_key, []))
         
         data_map = {}
         for item in existing_list:
-            raw_title = item.get('title_ja') or item.get('original_title') or item.get('title') or ""
-            clean_key = get_clean_title_key(raw_title)
+            clean_key = get_item_title_key(item)
             if not item.get('title_ja') and item.get('original_title'):
                 item['title_ja'] = item['original_title']
             data_map[clean_key] = item
@@ -346,89 +449,127 @@ def update_news():
             if new_clean_key in data_map:
                 existing_item = data_map[new_clean_key]
                 if existing_item['link'] == new_item['link']:
+                    merged_item = dict(existing_item)
+                    merged_item.update(new_item)
+                    for alt in existing_item.get('alt_sources', []):
+                        add_alt_source(merged_item, alt['title_ja'], alt['link'], alt['origin'])
                     # 更新时保留原有的 fetched_at（首次抓取时间）
-                    original_fetched_at = existing_item.get('fetched_at')
-                    data_map[new_clean_key].update(new_item)
-                    if original_fetched_at:
-                        data_map[new_clean_key]['fetched_at'] = original_fetched_at
-                    total_updated += 1
+                    if existing_item.get('fetched_at'):
+                        merged_item['fetched_at'] = existing_item['fetched_at']
+                    accepted.add(id(new_item))
+                    if merged_item == existing_item:
+                        total_unchanged += 1
+                    else:
+                        data_map[new_clean_key] = merged_item
+                        upserts.append(merged_item)
+                        total_updated += 1
                 else:
                     total_ignored += 1
             else:
                 data_map[new_clean_key] = new_item
+                upserts.append(new_item)
+                accepted.add(id(new_item))
                 total_added += 1
+        merged_days[date_key] = (before_list, data_map, upserts)
+
+    # 第二遍：删除已被新版本取代的旧条目后保存。新版本被忽略（改后的标题与另一条存档撞键）时保留旧条目
+    for date_key, (before_list, data_map, upserts) in merged_days.items():
+        file_path = store.view_path(date_key)
+        deletes = []
+        for previous_item, news_item in revised.get(date_key, []):
+            previous_key = get_item_title_key(previous_item)
+            if id(news_item) in accepted and data_map.get(previous_key) is previous_item:
+                del data_map[previous_key]
+                deletes.append(previous_key)
+                upserts = [item for item in upserts if item is not previous_item]
+                total_revised += 1
         
         final_list = list(data_map.values())
         final_list.sort(key=lambda x: x['timestamp'], reverse=True)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(final_list, f, ensure_ascii=False, indent=2)
-        
-        # 上传到 R2
-        upload_to_r2(r2_client, file_path, f"archive/{date_key}.json")
-        uploaded_archives.append(date_key)
-            
-        print(f"[{date_key}] 存档更新: 总{len(final_list)}条")
-
-    # === 生成 archive/index.json ===
-    print("正在生成归档索引...")
-    archive_index = {}
-    all_files = os.listdir(archive_dir)
-    for filename in all_files:
-        if filename.endswith(".json") and filename != "index.json":
-            date_str = filename.replace(".json", "")
-            try:
-                with open(os.path.join(archive_dir, filename), 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    archive_index[date_str] = len(data)
-            except Exception as e:
-                print(f"读取 {filename} 失败: {e}")
-    
-    index_path = os.path.join(archive_dir, 'index.json')
-    with open(index_path, 'w', encoding='utf-8') as f:
-        json.dump(archive_index, f, ensure_ascii=False, indent=2)
-    print("归档索引生成完毕。")
+        changed, body = store.save_day(date_key, final_list, upserts, deletes)
+        if changed:
+            touched_days[date_key] = len(final_list)
+            search_changes[date_key] = (before_list, final_list)
+            print(f"[{date_key}] 存档更新: 总{len(final_list)}条")
+        else:
+            skipped_writes += 1
+            print(f"[{date_key}] 存档无变化: 总{len(final_list)}条")
+
+        # 上传到 R2（与已发布内容一致时跳过）
+        publisher.publish(file_path, f"archive/{date_key}.json", body)
+
+    # jsonl 存储的日视图在这里统一写出（每个日期一次），之后的索引、首页都读视图文件
+    store.flush_views()
+
+    print(f"存档合并：新增 {total_added}（其中替换改过标题的旧版本 {total_revised}），更新 {total_updated}，"
+          f"未变 {total_unchanged}，忽略 {total_ignored}；跳过 {skipped_writes} 次无变化写入")
+    for name, n in (("added", total_added), ("revised", total_revised), ("updated", total_updated),
+                    ("unchanged", total_unchanged), ("ignored", total_ignored),
+                    ("days_written", len(touched_days))):
+        metrics.count(name, n, stage="merge")
+
+    # === 增量更新 archive/index.json（只重算本次写过的日期） ===
+    metrics.begin("index")
+    index_path = os.path.join(archive_dir, "index.json")
+    if touched_days or not os.path.exists(index_path):
+        print("正在更新归档索引...")
+        # 新建的日存档全部由当前规则过滤/分类，直接记上规则指纹；已有存档保留原指纹，留给 maintenance.py 处理
+        rule_stamps = {"filter": RULES_FINGERPRINT, "reclassify": RULES_FINGERPRINT}
+        stamps = {d: rule_stamps for d in touched_days if not existing_by_date.get(d)}
+        index_path = update_index(touched_days, archive_dir, stamps=stamps)
+        print("归档索引更新完毕。")
     
     # 上传 index.json 到 R2
-    upload_to_r2(r2_client, index_path, "archive/index.json")
-
-    # data.json 更新
-    homepage_news = []
-    seen_titles = set()
-    today = get_current_jst_time()
-    target_dates = [
-        today.strftime("%Y-%m-%d"),
-        (today - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-    ]
-    for date_str in target_dates:
-        path = os.path.join(archive_dir, f"{date_str}.json")
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                day_data = json.load(f)
-                for item in day_data:
-                    raw_title = item.get('title_ja') or item.get('original_title') or item.get('title') or ""
-                    clean_key = get_clean_title_key(raw_title)
-                    if clean_key not in seen_titles:
-                        homepage_news.append(item)
-                        seen_titles.add(clean_key)
-    
-    homepage_news.sort(key=lambda x: x['timestamp'], reverse=True)
-    
-    output_data = {
-        "last_updated": get_current_jst_time().strftime("%Y年%m月%d日 %H时%M分"),
-        "news": homepage_news
-    }
-    
-    data_json_path = 'public/data.json'
-    with open(data_json_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-    
-    # 上传 data.json 到 R2
-    upload_to_r2(r2_client, data_json_path, "data.json")
+    publisher.publish(index_path, "archive/index.json")
+
+    # data.json + 分片首页更新（manifest 最后上传）
+    metrics.begin("homepage")
+    homepage_news, homepage_outputs = write_homepage(archive_dir)
+    *shard_outputs, manifest_output = homepage_outputs
+    for local_path, r2_key, body in shard_outputs:
+        publisher.publish(local_path, r2_key, body)
+
+    metrics.count("items", len(homepage_news), stage="homepage")
+
+    # 检索索引只重写词项有变化的分片（新条目只涉及当月）；本地没有索引或格式过期时按全部存档重建
+    metrics.begin("search")
+    if has_search_index():
+        search_outputs = update_search_index(search_changes)
+    else:
+        search_outputs = rebuild_search_index(store)
+    search_manifest = search_outputs.pop() if search_outputs else None
+    for local_path, r2_key, body in search_outputs:
+        publisher.publish(local_path, r2_key, body)
+
+    metrics.count("shards_written", len(search_outputs), stage="search")
+
+    # 存档、索引、首页分片、检索分片并发上传完成后，再上传两个 manifest
+    metrics.begin("upload")
+    publisher.flush()
+    if search_manifest:
+        publisher.publish(*search_manifest)
+    publisher.publish(*manifest_output)
+    publisher.save()
+    metrics.count("uploaded", publisher.uploaded, stage="upload")
+    metrics.count("skipped", publisher.skipped, stage="upload")
+    metrics.end()
+
+    # 全部处理成功后才推进 watermark，中途失败时下次会重新处理
+    feed_state["watermark"] = newest
+    save_feed_state(feed_state)
     
     print(f"全部完成！首页数据 data.json 已包含 {len(homepage_news)} 条新闻。")
-    if r2_client:
-        print(f"✅ R2 上传完成：data.json, archive/index.json, 及 {len(uploaded_archives)} 个日期存档")
+    publisher.report()
+    check_failed_shards(failed_shards, strict_feeds)
+    return len(kept_entries)
 
 if __name__ == "__main__":
-    update_news()
\ No newline at end of file
+    # python main.py            运行一轮（GitHub Actions 定时任务）
+    # python main.py --daemon   常驻运行，按新闻到达速度自适应调整抓取间隔（见 scheduler.py）
+    if "--daemon" in sys.argv:
+        from scheduler import run_daemon
+        # 常驻模式下部分分片失败也算本轮失败，按退避间隔重试
+        run_daemon(lambda: update_news(strict_feeds=True))
+    else:
+        update_news()
\ No newline at end of file
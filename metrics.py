@@ -0,0 +1,211 @@
+import json
+import math
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from functools import wraps
+from common import CACHE_DIR, write_atomic
+
+# 运行指标：各阶段耗时与条数、请求延迟分位数、写入/上传字节数、缓存命中
+# 每次运行结束写出机器可读的 JSON 报告，可选输出 Prometheus textfile（供 node_exporter 采集）
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(CACHE_DIR, "metrics"))
+# 设置后在该目录写出 <前缀>_<任务名>.prom
+METRICS_PROM_DIR = os.environ.get("METRICS_PROM_DIR", "")
+METRICS_PROM_PREFIX = "jpnews"
+# 历史报告 (<任务名>.jsonl) 保留的行数
+METRICS_HISTORY = int(os.environ.get("METRICS_HISTORY", "500"))
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def percentile(sorted_values, q):
+    """最近秩分位数"""
+    if not sorted_values:
+        return None
+    # 秩 = ceil(q * n)（先舍去浮点误差，避免 0.7 * 10 取成 8）
+    index = min(len(sorted_values) - 1, max(0, math.ceil(round(q * len(sorted_values), 9)) - 1))
+    return sorted_values[index]
+
+
+class RunMetrics:
+    """
+    一次运行的指标，多线程共享。
+      begin(stage):   结束上一阶段并开始新阶段（按顺序执行的主流程用）
+      stage(name):    上下文管理器，统计一段代码的耗时（可重复进入，累加）
+      count(name, n): 计数（stage 参数给定时同时记为该阶段的条数）
+      observe(name, seconds): 记录一次请求延迟，报告中给出分位数
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.started_at = time.time()
+        self.start = time.monotonic()
+        self.stages = {}    # 名称 -> {"seconds": 秒, "items": {名称: 条数}}
+        self.counters = {}
+        self.samples = {}
+        self.status = "ok"
+        self.error = None
+        self.current = None  # (阶段名, 开始时刻)
+        self.lock = threading.Lock()
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {"seconds": 0.0, "items": {}})
+
+    def _add_seconds(self, name, seconds):
+        with self.lock:
+            self._stage(name)["seconds"] += seconds
+
+    def begin(self, name):
+        self.end()
+        self.current = (name, time.monotonic())
+
+    def end(self):
+        if self.current:
+            name, start = self.current
+            self._add_seconds(name, time.monotonic() - start)
+            self.current = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.monotonic()
+        try:
+            yield self
+        finally:
+            self._add_seconds(name, time.monotonic() - start)
+
+    def count(self, name, n=1, stage=None):
+        with self.lock:
+            if stage:
+                items = self._stage(stage)["items"]
+                items[name] = items.get(name, 0) + n
+            else:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def fail(self, error):
+        self.status = "failed"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def report(self):
+        self.end()
+        latency = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            latency[name] = {
+                "count": len(values),
+                "mean": round(sum(values) / len(values), 4),
+                **{f"p{int(q * 100)}": round(percentile(values, q), 4) for q in QUANTILES},
+                "max": round(values[-1], 4),
+            }
+        return {
+            "job": self.job,
+            "started_at": int(self.started_at),
+            "duration": round(time.monotonic() - self.start, 3),
+            "status": self.status,
+            "error": self.error,
+            "stages": {name: {"seconds": round(s["seconds"], 3), "items": s["items"]}
+                       for name, s in self.stages.items()},
+            "counters": self.counters,
+            "latency": latency,
+        }
+
+    def write(self, metrics_dir=METRICS_DIR, prom_dir=METRICS_PROM_DIR):
+        """写出最新报告 <任务名>.json，追加到历史 <任务名>.jsonl，并按需写 Prometheus textfile"""
+        report = self.report()
+        os.makedirs(metrics_dir, exist_ok=True)
+        write_atomic(os.path.join(metrics_dir, f"{self.job}.json"),
+                     json.dumps(report, ensure_ascii=False, indent=2))
+
+        history_path = os.path.join(metrics_dir, f"{self.job}.jsonl")
+        lines = []
+        if os.path.exists(history_path):
+            with open(history_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        lines.append(json.dumps(report, ensure_ascii=False, separators=(',', ':')))
+        write_atomic(history_path, "\n".join(lines[-METRICS_HISTORY:]) + "\n")
+
+        if prom_dir:
+            os.makedirs(prom_dir, exist_ok=True)
+            write_atomic(os.path.join(prom_dir, f"{METRICS_PROM_PREFIX}_{self.job}.prom"), to_prometheus(report))
+        return report
+
+    def summary(self):
+        report = self.report()
+        stages = "，".join(f"{name} {s['seconds']:.2f}s" for name, s in report["stages"].items())
+        print(f"运行指标 [{self.job}] 共 {report['duration']:.2f}s：{stages}")
+
+
+def _labels(**labels):
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+def to_prometheus(report):
+    """报告转成 Prometheus 文本格式"""
+    p = METRICS_PROM_PREFIX
+    job = report["job"]
+    lines = []
+
+    def metric(name, help_text, samples):
+        lines.append(f"# HELP {p}_{name} {help_text}")
+        lines.append(f"# TYPE {p}_{name} gauge")
+        for labels, value in samples:
+            lines.append(f"{p}_{name}{_labels(job=job, **labels)} {value}")
+
+    metric("run_timestamp_seconds", "Start time of the last run.", [({}, report["started_at"])])
+    metric("run_duration_seconds", "Wall time of the last run.", [({}, report["duration"])])
+    metric("run_success", "1 if the last run succeeded.", [({}, int(report["status"] == "ok"))])
+    metric("stage_seconds", "Wall time per pipeline stage.",
+           [({"stage": name}, s["seconds"]) for name, s in report["stages"].items()])
+    metric("stage_items", "Items counted per pipeline stage.",
+           [({"stage": name, "kind": kind}, n)
+            for name, s in report["stages"].items() for kind, n in s["items"].items()])
+    metric("count", "Run counters (bytes, requests, cache hits).",
+           [({"name": name}, value) for name, value in report["counters"].items()])
+    metric("latency_seconds", "Request latency quantiles.",
+           [({"name": name, "quantile": str(q)}, stats[f"p{int(q * 100)}"])
+            for name, stats in report["latency"].items() for q in QUANTILES])
+    return "\n".join(lines) + "\n"
+
+
+# 当前运行；没有在记录时指标写入一个不会输出的实例，库函数可以无条件调用
+_current = RunMetrics("unrecorded")
+
+def get_metrics():
+    return _current
+
+@contextmanager
+def record_run(job):
+    """记录一次运行：期间 get_metrics() 返回本次的实例，结束（含异常）时写出报告"""
+    global _current
+    previous, _current = _current, RunMetrics(job)
+    metrics = _current
+    try:
+        yield metrics
+    except BaseException as e:
+        metrics.fail(e)
+        raise
+    finally:
+        _current = previous
+        try:
+            metrics.write()
+            metrics.summary()
+        except Exception:
+            traceback.print_exc()
+
+def instrumented(job):
+    """装饰器：整个函数作为一次运行记录"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with record_run(job):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,67 +1,50 @@
-import json
-import os
-import glob
-from deep_translator import GoogleTranslator
-import time
+import sys
+from translation import translate_titles
+from zh_convert import OPENCC_CONFIG, PHRASE_TABLE, convert_items, to_traditional, use_local_tc
+from archive_pipeline import fingerprint, register_transform, run_pipeline
 
-def migrate_data():
-    translator = GoogleTranslator(source='ja', target='zh-TW')
-    
-    # 1. Migrate data.json
-    print("Migrating data.json...")
-    if os.path.exists('data.json'):
-        with open('data.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        updated_count = 0
-        if 'news' in data:
-            for item in data['news']:
-                if 'title_tc' not in item:
-                    try:
-                        # Translate from Japanese title if available, else use title (SC)
-                        source_text = item.get('title_ja', item.get('title', ''))
-                        if source_text:
-                            item['title_tc'] = translator.translate(source_text)
-                            updated_count += 1
-                        else:
-                            print("Skipping item with no title")
-                    except Exception as e:
-                        print(f"Error translating: {e}")
-                        item['title_tc'] = item.get('title', '') # Fallback to SC
-            
-            if updated_count > 0:
-                with open('data.json', 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                print(f"Updated {updated_count} items in data.json")
-            else:
-                print("No items needed update in data.json")
+def fill_title_tc(items):
+    """给缺少 title_tc 的条目补上繁体标题（本地转换或经翻译缓存请求 zh-TW），返回补齐的条数"""
+    todo = [item for item in items if 'title_tc' not in item]
+    if use_local_tc():
+        # 本地由简体标题转换，不发翻译请求
+        for item in todo:
+            item['title_tc'] = to_traditional(item.get('title', ''))
+        return len(todo)
 
-    # 2. Migrate archive files
-    print("Migrating archive files...")
-    archive_files = glob.glob('archive/*.json')
-    for file_path in archive_files:
-        print(f"Processing {file_path}...")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            items = json.load(f)
-        
-        file_updated_count = 0
-        for item in items:
-            if 'title_tc' not in item:
-                try:
-                    source_text = item.get('title_ja', item.get('title', ''))
-                    if source_text:
-                        item['title_tc'] = translator.translate(source_text)
-                        file_updated_count += 1
-                except Exception as e:
-                    print(f"Error translating in {file_path}: {e}")
-                    item['title_tc'] = item.get('title', '')
-        
-        if file_updated_count > 0:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(items, f, ensure_ascii=False, indent=2)
-            print(f"Updated {file_updated_count} items in {file_path}")
+    # Translate from Japanese title if available, else use title (SC)
+    sources = [item.get('title_ja', item.get('title', '')) for item in todo]
+    translated = translate_titles([text for text in sources if text], targets=("zh-TW",))["zh-TW"]
+
+    updated_count = 0
+    results = iter(translated)
+    for item, source_text in zip(todo, sources):
+        if not source_text:
+            print("Skipping item with no title")
+            continue
+        title_tc = next(results)
+        if title_tc == source_text:
+            item['title_tc'] = item.get('title', '') # Fallback to SC
         else:
-            print(f"No items needed update in {file_path}")
+            item['title_tc'] = title_tc
+            updated_count += 1
+    return updated_count
+
+# 只补缺失的 title_tc，已有的不改；网络模式依赖进程内的翻译缓存和限速器，只能单进程运行
+@register_transform("tc_backfill", fingerprint("title_tc", 1), order=50, per_item=False, parallel=use_local_tc())
+def backfill_title_tc(items):
+    fill_title_tc(items)
+    return items
+
+# 按简体标题本地重新生成全部 title_tc（词表或 OpenCC 配置变化后执行一次），需 --only 指定
+@register_transform("tc_convert", fingerprint(OPENCC_CONFIG, PHRASE_TABLE), order=55, default=False)
+def convert_title_tc(item):
+    convert_items([item])
+    return item
+
+def migrate_data(dry_run=False, force=False):
+    """给存档补齐繁体标题，首页 data.json 随后由存档重建"""
+    return run_pipeline(["tc_backfill"], dry_run=dry_run, force=force)
 
 if __name__ == "__main__":
-    migrate_data()
+    migrate_data(dry_run="--dry-run" in sys.argv, force="--force" in sys.argv)
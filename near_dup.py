@@ -0,0 +1,132 @@
+import hashlib
+import os
+import re
+import struct
+import unicodedata
+from news_core import get_clean_title_key
+
+# 近似重复判定：标题字符 n-gram 集合的 Jaccard 相似度不低于阈值
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.6"))
+# 参与比对的最近天数（跨日存档），与首页展示的天数一致
+NEAR_DUP_DAYS = int(os.environ.get("NEAR_DUP_DAYS", "2"))
+
+SHINGLE_SIZE = 3
+# MinHash 签名长度 = BANDS * ROWS；相似度 0.6 的标题进入候选的概率约 98%，
+# 候选阈值 (1/BANDS)^(1/ROWS) ≈ 0.4 低于判定阈值，候选再做精确校验
+BANDS = 16
+ROWS = 3
+# 每个 n-gram 只做一次 shake_128，把输出切成 BANDS*ROWS 个 16 位哈希值，
+# 签名按列取最小值；比逐个排列做 (a*h+b) mod p 的大整数运算快约 7 倍
+_SIGNATURE = struct.Struct(f"<{BANDS * ROWS}H")
+
+# 转载标题常见的附加部分：【速報】前缀、末尾的（媒体名）/（2025年12月2日掲載）、｜之后的栏目名
+_PREFIX_TAG = re.compile(r"^[【\[][^】\]]*[】\]]")
+_SUFFIX_PIPE = re.compile(r"[｜|].*$")
+_NOISE = re.compile(r"[\s\W_]+")
+_NUMBER = re.compile(r"\d+")
+
+def _strip_trailing_parens(text):
+    """去掉末尾（可嵌套）的括号段，如「（テレビ朝日系（ANN））」"""
+    while text and text[-1] in ")）":
+        depth = 0
+        for i in range(len(text) - 1, -1, -1):
+            if text[i] in ")）":
+                depth += 1
+            elif text[i] in "(（":
+                depth -= 1
+                if depth == 0:
+                    break
+        else:
+            return text
+        text = text[:i].rstrip()
+    return text
+
+def normalize_title(title_ja):
+    """去掉来源后缀、转载附加的媒体名和标点，只保留正文字符"""
+    text = unicodedata.normalize("NFKC", get_clean_title_key(title_ja))
+    text = _PREFIX_TAG.sub("", text)
+    text = _SUFFIX_PIPE.sub("", text)
+    return _NOISE.sub("", _strip_trailing_parens(text.strip()))
+
+def shingles(title_ja, size=SHINGLE_SIZE):
+    text = normalize_title(title_ja)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def numbers(title_ja):
+    """标题中的数字；「今年29日目」「今年30日目」这类数字不同的是不同报道"""
+    return frozenset(_NUMBER.findall(normalize_title(title_ja)))
+
+def minhash(shingle_set):
+    digests = [hashlib.shake_128(s.encode("utf-8")).digest(_SIGNATURE.size) for s in shingle_set]
+    return list(map(min, zip(*map(_SIGNATURE.unpack, digests))))
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDupIndex:
+    """
+    标题近似重复索引（MinHash + LSH 分桶）。
+    add() 登记标题及其关联对象，find() 返回最相似且达到阈值的已登记对象；
+    LSH 只负责筛出候选，最终以 n-gram 集合的精确 Jaccard 判定，不会因哈希碰撞误合并；
+    标题中的数字不一致时（日期、次数、金额）视为不同报道。
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD):
+        self.threshold = threshold
+        self.buckets = [{} for _ in range(BANDS)]
+        self.entries = []  # [(shingle_set, numbers, payload)]
+        self.candidates_checked = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _bands(self, signature):
+        for band in range(BANDS):
+            yield band, tuple(signature[band * ROWS:(band + 1) * ROWS])
+
+    def add(self, title_ja, payload):
+        shingle_set = shingles(title_ja)
+        if not shingle_set:
+            return
+        entry_id = len(self.entries)
+        self.entries.append((shingle_set, numbers(title_ja), payload))
+        for band, key in self._bands(minhash(shingle_set)):
+            self.buckets[band].setdefault(key, []).append(entry_id)
+
+    def find(self, title_ja):
+        """返回 (payload, 相似度)；没有近似重复时返回 (None, 0.0)"""
+        shingle_set = shingles(title_ja)
+        if not shingle_set:
+            return None, 0.0
+        candidates = set()
+        for band, key in self._bands(minhash(shingle_set)):
+            candidates.update(self.buckets[band].get(key, ()))
+        self.candidates_checked += len(candidates)
+
+        title_numbers = numbers(title_ja)
+        best, best_score = None, 0.0
+        for entry_id in sorted(candidates):
+            entry_shingles, entry_numbers, _ = self.entries[entry_id]
+            if entry_numbers != title_numbers:
+                continue
+            score = jaccard(shingle_set, entry_shingles)
+            if score > best_score:
+                best, best_score = entry_id, score
+        if best is None or best_score < self.threshold:
+            return None, 0.0
+        return self.entries[best][2], best_score
+
+def add_alt_source(item, title_ja, link, origin):
+    """把转载来源记到代表条目的 alt_sources 上，返回是否新增（代表条目自身的链接不算转载）"""
+    if link in (item.get('link'), item.get('feed_link')):
+        return False
+    alt_sources = item.setdefault('alt_sources', [])
+    if any(alt.get('link') == link for alt in alt_sources):
+        return False
+    alt_sources.append({"title_ja": title_ja, "link": link, "origin": origin})
+    return True
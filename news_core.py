@@ -0,0 +1,194 @@
+import datetime
+import hashlib
+import json
+from functools import lru_cache
+from urllib.parse import urlparse
+from matcher import KeywordMatcher
+
+# 日本时间 (UTC+9)
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+def get_current_jst_time():
+    return datetime.datetime.now(JST)
+
+def get_clean_title_key(full_title):
+    if not full_title:
+        return ""
+    if " - " in full_title:
+        return full_title.rsplit(" - ", 1)[0].strip()
+    return full_title.strip()
+
+def get_item_title_key(item):
+    raw_title = item.get('title_ja') or item.get('original_title') or item.get('title') or ""
+    return get_clean_title_key(raw_title)
+
+# === 媒体名称 -> 官网域名 映射表 ===
+# 只要 origin 里包含 Key 中的文字，就使用对应的域名（靠前的 Key 优先）
+MEDIA_DOMAIN_MAP = {
+    "Yahoo": "news.yahoo.co.jp",
+    "雅虎": "news.yahoo.co.jp",
+    "日本経済新聞": "www.nikkei.com",
+    "日経": "www.nikkei.com",
+    "Nikkei": "www.nikkei.com",
+    "NHK": "www3.nhk.or.jp",
+    "TBS": "newsdig.tbs.co.jp",
+    "JNN": "newsdig.tbs.co.jp",
+    "FNN": "www.fnn.jp",
+    "フジテレビ": "www.fnn.jp",
+    "富士": "www.fnn.jp",
+    "日テレ": "news.ntv.co.jp",
+    "日本テレビ": "news.ntv.co.jp",
+    "NNN": "news.ntv.co.jp",
+    "テレ朝": "news.tv-asahi.co.jp",
+    "テレビ朝日": "news.tv-asahi.co.jp",
+    "ANN": "news.tv-asahi.co.jp",
+    "毎日新聞": "mainichi.jp",
+    "朝日新聞": "www.asahi.com",
+    "読売新聞": "www.yomiuri.co.jp",
+    "産経": "www.sankei.com",
+    "Sankei": "www.sankei.com",
+    "共同": "www.kyodo.co.jp",
+    "Kyodo": "www.kyodo.co.jp",
+    "時事": "www.jiji.com",
+    "Jiji": "www.jiji.com",
+    "東洋経済": "toyokeizai.net",
+    "現代ビジネス": "gendai.media",
+    "Diamond": "diamond.jp",
+    "ダイヤモンド": "diamond.jp",
+    "JBpress": "jbpress.ismedia.jp",
+    "Newsweek": "www.newsweekjapan.jp",
+    "CNN": "www.cnn.co.jp",
+    "BBC": "www.bbc.com",
+    "Bloomberg": "www.bloomberg.co.jp",
+    "Reuters": "jp.reuters.com",
+    "路透": "jp.reuters.com",
+    "Record China": "www.recordchina.co.jp",
+    "サーチナ": "searchina.net",
+    "北海道新聞": "www.hokkaido-np.co.jp",
+    "東京新聞": "www.tokyo-np.co.jp",
+    "西日本新聞": "www.nishinippon.co.jp",
+    "中日新聞": "www.chunichi.co.jp",
+    "沖縄タイムス": "www.okinawatimes.co.jp",
+    "琉球新報": "ryukyushimpo.jp"
+}
+
+# 每个 Key 单独成组，按 Key 在映射表中的顺序取第一个命中的（与逐个 `in` 判断的旧写法一致）
+_DOMAIN_KEYS = list(MEDIA_DOMAIN_MAP)
+_DOMAIN_MATCHER = KeywordMatcher({key: [key] for key in _DOMAIN_KEYS})
+
+@lru_cache(maxsize=4096)
+def resolve_origin_domain(origin):
+    """媒体名称 -> 官网域名（未收录时返回空字符串），同一名称只计算一次"""
+    key = _DOMAIN_MATCHER.first(origin or "", _DOMAIN_KEYS)
+    return MEDIA_DOMAIN_MAP[key] if key else ""
+
+def resolve_logo_domain(origin, url=""):
+    """取 Logo 用的域名：先查映射表，再用 url 的主机名（Google 的跳转链接除外）"""
+    domain = resolve_origin_domain(origin)
+    if domain or not url:
+        return domain
+    host = urlparse(url).netloc
+    return "" if "google" in host else host
+
+# === 过滤 / 分类规则 ===
+# 1. 假新闻过滤名单
+IGNORE_KEYWORDS = [
+    "中国地方", "中国地区", "中国５県", "中国五県",
+    "中国電力", "中国電", "中電",
+    "中国銀行", "中国銀",
+    "中国道", "中国自動車道",
+    "中国運輸局", "中国整備局", "中国経産局",
+    "中国新人", "中国大会", "中国リーグ",
+    "中国バス", "中国ジェイアール",
+    "鳥取", "島根", "岡山", "広島", "山口"
+]
+# 白名单 (有这些词的就算有干扰词也不删)
+WHITELIST_KEYWORDS = [
+    "北京", "上海", "深圳", "香港", "台湾", "習近平", "李強", "共産党", "中共", 
+    "人民元", "外交部", "領事館", "総領事", "中国政府", "日中", "中日", "GDP",
+    "EV", "不動産", "軍", "ミサイル", "台湾有事", "尖閣"
+]
+
+# 2. 新的分类逻辑 (无科技，有军事)
+CATEGORY_KEYWORDS = {
+    "军事": [
+        "军事", "国防", "军", "军队", "解放军", "核武器", "导弹", "演习", "训练", 
+        "巡逻", "海警", "海警局", "钓鱼岛", "尖阁", "南海", "东海", "台海", 
+        "航母", "战斗机", "战机", "舰艇", "潜艇", "驱逐舰", "轰炸机", "侦察机",
+        "入侵", "领空", "领海", "雷达", "部队", "战备", "武力", "威慑"
+    ],
+    "经济": [
+        "经济", "贸易", "股市", "投资", "银行", "企业", "GDP", "市场", "消费", "产业", 
+        "汇率", "美元", "日元", "通胀", "物价", "工资", "就业", "失业", "房地产", "楼市", 
+        "央行", "利率", "加息", "降息", "关税", "出口", "进口", "供应链", "制造", "财报", 
+        "亏损", "盈利", "收购", "合并", "破产", "裁员",
+        # 原科技词汇并入经济
+        "科技", "技术", "研发", "AI", "人工智能", "芯片", "半导体", "电动车", "EV", "比亚迪", 
+        "宁德时代", "华为", "腾讯", "阿里", "字节", "TikTok", "百度", "丰田", "本田", "日产", 
+        "索尼", "松下", "软银", "5G", "6G", "互联网", "机器人", "无人机", "手机", "智能",
+        "太空", "宇宙", "卫星", "火箭", "嫦娥", "神舟", "空间站"
+    ],
+    "社会": [
+        "社会", "人口", "教育", "医疗", "犯罪", "事故", "灾害", "疫情", "感染", "新冠", 
+        "生活", "旅游", "签证", "移民", "少子化", "老龄化", "养老", "福利", "保险", 
+        "医院", "学校", "学生", "老师", "大学", "高考", "留学", "治安", "警察", "逮捕", 
+        "审判", "法院", "律师", "死刑", "地震", "台风", "暴雨", "洪水", "火灾", 
+        "交通", "铁路", "新干线", "航班", "机场", "地铁", "公交", "食品", "安全", 
+        "环境", "污染", "垃圾", "气候", "变暖", "碳中和", "核电", "核污水", "排海", "靖国神社", "熊猫"
+    ],
+    "体育": [
+        "体育", "奥运", "足球", "篮球", "棒球", "选手", "比赛", "冠军", "大谷", "翔平", 
+        "羽生", "结弦", "乒乓", "网球", "游泳", "田径", "马拉松", "相扑", "柔道", 
+        "世界杯", "亚洲杯", "亚运会", "联赛", "俱乐部", "球队", "金牌"
+    ],
+    "娱乐": [
+        "娱乐", "电影", "音乐", "动漫", "电视剧", "明星", "偶像", "演唱会", "综艺", 
+        "声优", "吉卜力", "鬼灭", "海贼王", "进击的巨人", "AKB", "乃木坂", "杰尼斯", 
+        "游戏", "黑神话", "原神", "任天堂"
+    ],
+    "时政": [
+        "政府", "政策", "习近平", "李强", "外交", "政治", "选举", "议员", "首相", "总统", 
+        "中共", "党", "人权", "制裁", "大使", "领事", "条约", "协定", "峰会", "会谈", 
+        "大臣", "内阁", "国会", "参议院", "众议院", "自民党", "拜登", "特朗普", "普京", 
+        "岸田", "石破", "高市", "关系", "互访"
+    ]
+}
+
+CATEGORY_PRIORITY = ["军事", "体育", "娱乐", "社会", "经济", "时政"]
+
+# 所有规则词在导入时编译好，分类/过滤时不再逐词扫描
+RULE_MATCHER = KeywordMatcher({
+    **CATEGORY_KEYWORDS,
+    "ignore": IGNORE_KEYWORDS,
+    "whitelist": WHITELIST_KEYWORDS,
+})
+
+# 过滤/分类逻辑本身（而非关键词）改动时递增，使存档全部重新维护
+RULES_VERSION = 1
+
+def get_rules_fingerprint():
+    """规则集指纹：关键词表 + 分类优先级 + 逻辑版本，任何一项变化都会得到新指纹"""
+    rules = {
+        "version": RULES_VERSION,
+        "ignore": IGNORE_KEYWORDS,
+        "whitelist": WHITELIST_KEYWORDS,
+        "categories": CATEGORY_KEYWORDS,
+        "priority": CATEGORY_PRIORITY,
+    }
+    raw = json.dumps(rules, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+RULES_FINGERPRINT = get_rules_fingerprint()
+
+def is_false_positive(title, source_name):
+    # 针对"中国新闻(Chugoku Shimbun)"媒体
+    if "中国新聞" in source_name:
+        if not RULE_MATCHER.hit(title, "whitelist"):
+            return True
+    # 检查标题：含干扰词且不含白名单词
+    if RULE_MATCHER.hit(title, "ignore"):
+        return not RULE_MATCHER.hit(title, "whitelist")
+    return False
+
+def classify_news(title):
+    return RULE_MATCHER.first(title, CATEGORY_PRIORITY) or "其他"
@@ -0,0 +1,267 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from common import CACHE_DIR, write_atomic
+from metrics import get_metrics
+
+# === R2 配置 ===
+R2_ACCOUNT_ID = os.environ.get("CLOUDFLARE_ACCOUNT_ID", "")
+R2_ACCESS_KEY = os.environ.get("CLOUDFLARE_R2_ACCESS_KEY_ID", "")
+R2_SECRET_KEY = os.environ.get("CLOUDFLARE_R2_SECRET_ACCESS_KEY", "")
+R2_BUCKET_NAME = os.environ.get("R2_BUCKET_NAME", "cnjp-data")
+
+# 并发上传：所有线程共用一个客户端，连接池与并发数一致
+UPLOAD_WORKERS = int(os.environ.get("R2_UPLOAD_WORKERS", "8"))
+UPLOAD_RETRIES = int(os.environ.get("R2_UPLOAD_RETRIES", "3"))
+UPLOAD_BACKOFF = 0.5  # 秒，每次重试翻倍
+
+# 已发布对象的内容哈希清单，用于跳过内容未变的上传
+PUBLISH_MANIFEST_FILE = os.path.join(CACHE_DIR, "publish_manifest.json")
+
+# 上传前预压缩：对象以 gzip 编码存储（所有客户端都支持，R2 按 Content-Encoding 原样返回）；
+# 设为 0 时按原样上传。前端直接请求 <key>，不做编码协商，因此不另存 Brotli 版本
+PRECOMPRESS = os.environ.get("R2_PRECOMPRESS", "1") != "0"
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+@lru_cache(maxsize=None)
+def get_r2_client(max_connections=UPLOAD_WORKERS):
+    """获取 R2 客户端（boto3 客户端线程安全，连接池按并发上传数设置；进程内复用同一个）"""
+    if not R2_ACCOUNT_ID or not R2_ACCESS_KEY or not R2_SECRET_KEY:
+        print("⚠️ R2 credentials not configured, skipping R2 upload")
+        return None
+    # boto3 导入较慢，只在真正需要上传时导入
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        's3',
+        endpoint_url=f'https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com',
+        aws_access_key_id=R2_ACCESS_KEY,
+        aws_secret_access_key=R2_SECRET_KEY,
+        config=Config(signature_version='s3v4', max_pool_connections=max_connections),
+        region_name='auto'
+    )
+
+def guess_content_type(r2_key):
+    """按扩展名确定 Content-Type，未知时按 JSON"""
+    return mimetypes.guess_type(r2_key)[0] or 'application/json'
+
+def put_bytes(client, body, r2_key, content_encoding=None, retries=UPLOAD_RETRIES):
+    """
+    上传一段字节到 R2，失败按指数退避重试。
+    返回结果 {"key", "ok", "bytes", "attempts", "seconds", "error"}
+    """
+    extra = {'ContentEncoding': content_encoding} if content_encoding else {}
+    result = {"key": r2_key, "ok": False, "bytes": len(body), "attempts": 0, "seconds": 0.0, "error": None}
+    start = time.monotonic()
+    for attempt in range(1, retries + 1):
+        result["attempts"] = attempt
+        try:
+            client.put_object(
+                Bucket=R2_BUCKET_NAME,
+                Key=r2_key,
+                Body=body,
+                ContentType=guess_content_type(r2_key),
+                **extra
+            )
+            result["ok"] = True
+            result["error"] = None
+            break
+        except Exception as e:
+            result["error"] = str(e)
+            if attempt < retries:
+                time.sleep(UPLOAD_BACKOFF * 2 ** (attempt - 1))
+    result["seconds"] = time.monotonic() - start
+    metrics = get_metrics()
+    metrics.observe("upload_request", result["seconds"])
+    if result["ok"]:
+        metrics.count("uploads")
+        metrics.count("upload_bytes", len(body))
+        print(f"✅ Uploaded to R2: {r2_key}")
+    else:
+        metrics.count("upload_failures")
+        print(f"❌ R2 upload failed for {r2_key}: {result['error']}")
+    return result
+
+def upload_many(client, objects, workers=UPLOAD_WORKERS):
+    """
+    并发上传多个对象。objects: [(r2_key, body, content_encoding), ...]
+    返回与输入顺序一致的结果列表（见 put_bytes）
+    """
+    if client is None or not objects:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(objects)))) as pool:
+        return list(pool.map(lambda obj: put_bytes(client, obj[1], obj[0], obj[2]), objects))
+
+def dump_json(data):
+    """紧凑序列化（无缩进、无多余空白），前端下载和解析的都是这份"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def write_json_if_changed(path, data):
+    """
+    序列化后与磁盘上的内容比较，只有不同才写入。
+    返回 (是否写入, 序列化后的字节)，字节可直接交给 Publisher，无需再读回文件。
+    """
+    body = dump_json(data)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == body:
+                get_metrics().count("writes_unchanged")
+                return False, body
+    write_atomic(path, body)
+    get_metrics().count("files_written")
+    get_metrics().count("bytes_written", len(body))
+    return True, body
+
+def gzip_bytes(body):
+    """gzip 固定 mtime，保证相同内容得到相同字节"""
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+def compress_variants(body):
+    """各压缩方式的体积 {encoding: bytes}，用于体积报告（上传只用 gzip）"""
+    variants = {"gzip": gzip_bytes(body)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants
+
+def format_size_report(name, body, variants):
+    parts = [f"{name}: {len(body) / 1024:.1f} KB"]
+    for encoding, data in variants.items():
+        change = (len(data) / len(body) - 1) * 100 if body else 0
+        parts.append(f"{encoding} {len(data) / 1024:.1f} KB ({change:+.0f}%)")
+    return "，".join(parts)
+
+
+class Publisher:
+    """
+    按内容哈希发布到 R2：与本地清单（或远端 ETag）一致的对象直接跳过，
+    其余对象排队，flush() 时经同一个客户端并发上传，并统计上传/跳过的次数和字节数。
+    """
+
+    def __init__(self, client, manifest_path=PUBLISH_MANIFEST_FILE, precompress=PRECOMPRESS):
+        self.client = client
+        self.manifest_path = manifest_path
+        self.precompress = precompress
+        self.manifest = {}
+        self.queue = []  # [(r2_key, digest, [(key, body, encoding), ...])]
+        self.results = []
+        self.uploaded = 0
+        self.uploaded_bytes = 0
+        self.skipped = 0
+        self.skipped_bytes = 0
+        self.failed = 0
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    self.manifest = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 发布清单读取失败，将重新建立: {e}")
+
+    def remote_md5(self, r2_key):
+        """单次上传的对象 ETag 即内容 MD5；HEAD 属于 B 类操作，比重复 PUT 便宜"""
+        try:
+            head = self.client.head_object(Bucket=R2_BUCKET_NAME, Key=r2_key)
+            return head.get('ETag', '').strip('"')
+        except Exception:
+            return None
+
+    def publish(self, local_path, r2_key, body=None):
+        """
+        内容变化时把对象加入上传队列，返回是否需要上传。
+        传入 body 时直接使用内存中的字节，不再读取 local_path。
+        """
+        if self.client is None:
+            return False
+        if body is None:
+            with open(local_path, 'rb') as f:
+                body = f.read()
+        digest = hashlib.md5(body).hexdigest()
+        # 图片等已压缩的格式不再预压缩
+        compressible = guess_content_type(r2_key) == 'application/json'
+        variants = {"gzip": gzip_bytes(body)} if self.precompress and compressible else {}
+        # 对象实际存储的字节（gzip 或原文）
+        stored = variants.get("gzip", body)
+
+        metrics = get_metrics()
+        known = self.manifest.get(r2_key)
+        if known is None and self.remote_md5(r2_key) == hashlib.md5(stored).hexdigest():
+            known = digest
+            metrics.count("publish_remote_hits")
+        if known == digest:
+            self.manifest[r2_key] = digest
+            self.skipped += 1
+            self.skipped_bytes += len(stored)
+            metrics.count("publish_cache_hits")
+            metrics.count("publish_skipped_bytes", len(stored))
+            return False
+        metrics.count("publish_cache_misses")
+
+        print("  " + format_size_report(r2_key, body, variants))
+        objects = [(r2_key, stored, "gzip" if variants else None)]
+        self.queue.append((r2_key, digest, objects))
+        return True
+
+    def flush(self):
+        """并发上传队列中的所有对象；上传成功的才记入清单"""
+        if not self.queue:
+            return []
+        queue, self.queue = self.queue, []
+        objects = [obj for _, _, objs in queue for obj in objs]
+        start = time.monotonic()
+        results = upload_many(self.client, objects)
+        elapsed = time.monotonic() - start
+
+        by_key = {result["key"]: result for result in results}
+        for r2_key, digest, objs in queue:
+            if all(by_key[key]["ok"] for key, _, _ in objs):
+                self.manifest[r2_key] = digest
+        for result in results:
+            if result["ok"]:
+                self.uploaded += 1
+                self.uploaded_bytes += result["bytes"]
+            else:
+                self.failed += 1
+        self.results.extend(results)
+        print(f"并发上传 {len(results)} 个对象，耗时 {elapsed:.1f}s")
+        return results
+
+    def save(self):
+        """上传剩余队列并保存清单"""
+        if self.client is None:
+            return
+        self.flush()
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def report(self):
+        if self.client is None:
+            return
+        print(f"R2 发布：上传 {self.uploaded} 个对象 ({self.uploaded_bytes / 1024:.1f} KB)，"
+              f"未变化跳过 {self.skipped} 个 ({self.skipped_bytes / 1024:.1f} KB)"
+              f"{f'，失败 {self.failed} 个' if self.failed else ''}")
+        for result in self.results:
+            if not result["ok"]:
+                print(f"  ❌ {result['key']}: 重试 {result['attempts']} 次后失败 ({result['error']})")
+
+
+if __name__ == "__main__":
+    # python publish.py [文件 ...]  打印各产物的体积报告：缩进版 / 紧凑版 / gzip / br
+    paths = sys.argv[1:] or ["public/data.json", "public/archive/index.json"]
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        pretty = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        compact = dump_json(data)
+        print(f"{path}: 缩进版 {len(pretty) / 1024:.1f} KB")
+        print("  " + format_size_report("紧凑版", compact, compress_variants(compact)))
@@ -0,0 +1,134 @@
+import datetime
+import json
+import os
+import signal
+import threading
+import time
+import traceback
+from common import CACHE_DIR, write_atomic
+from news_core import JST
+
+# 常驻模式：进程内保留 R2 客户端、翻译/补全线程池和各类缓存，按新闻到达速度自适应调整抓取间隔
+# 间隔 = 期望每轮处理的条数 / 最近的到达速度（条/分钟，指数滑动平均），限制在上下限之间
+DAEMON_MIN_INTERVAL = float(os.environ.get("DAEMON_MIN_INTERVAL", "120"))     # 秒
+DAEMON_MAX_INTERVAL = float(os.environ.get("DAEMON_MAX_INTERVAL", "900"))     # 秒
+DAEMON_NIGHT_INTERVAL = float(os.environ.get("DAEMON_NIGHT_INTERVAL", "1800"))  # 夜间上限
+DAEMON_TARGET_ITEMS = float(os.environ.get("DAEMON_TARGET_ITEMS", "5"))
+DAEMON_SMOOTHING = float(os.environ.get("DAEMON_SMOOTHING", "0.3"))
+# 夜间时段（日本时间，[起, 止) 小时），新闻稀少时允许拉长到 DAEMON_NIGHT_INTERVAL
+DAEMON_NIGHT_HOURS = tuple(int(h) for h in os.environ.get("DAEMON_NIGHT_HOURS", "1,6").split(","))
+
+DAEMON_STATUS_FILE = os.path.join(CACHE_DIR, "daemon_status.json")
+
+
+def is_night(now=None):
+    hour = (now or datetime.datetime.now(JST)).hour
+    start, end = DAEMON_NIGHT_HOURS
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+class AdaptiveInterval:
+    """根据每轮新条目数估计到达速度，给出下一轮的等待秒数"""
+
+    def __init__(self, min_interval=DAEMON_MIN_INTERVAL, max_interval=DAEMON_MAX_INTERVAL,
+                 night_interval=DAEMON_NIGHT_INTERVAL, target_items=DAEMON_TARGET_ITEMS,
+                 smoothing=DAEMON_SMOOTHING):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.night_interval = max(night_interval, max_interval)
+        self.target_items = target_items
+        self.smoothing = smoothing
+        self.velocity = None  # 条/分钟
+        self.interval = min_interval
+
+    def observe(self, new_items, elapsed, night=False):
+        """记录一轮结果（elapsed 为距上一轮开始的秒数），返回下一轮的等待秒数"""
+        rate = new_items / max(elapsed / 60, 1e-6)
+        if self.velocity is None:
+            self.velocity = rate
+        else:
+            self.velocity = self.smoothing * rate + (1 - self.smoothing) * self.velocity
+        upper = self.night_interval if night else self.max_interval
+        if self.velocity <= 0:
+            self.interval = upper
+        else:
+            self.interval = self.target_items / self.velocity * 60
+        self.interval = min(max(self.interval, self.min_interval), upper)
+        return self.interval
+
+    def backoff(self):
+        """本轮失败：间隔翻倍（不超过上限）"""
+        self.interval = min(max(self.interval * 2, self.min_interval), self.max_interval)
+        return self.interval
+
+
+def write_status(status, path=DAEMON_STATUS_FILE):
+    """健康/状态文件：外部监控读取 last_run_at、last_ok、next_run_at 判断进程是否正常"""
+    write_atomic(path, json.dumps(status, ensure_ascii=False, indent=2))
+
+
+def run_daemon(run_once, status_path=DAEMON_STATUS_FILE, max_runs=None):
+    """
+    循环执行 run_once()（返回本轮新条目数），收到 SIGTERM / SIGINT 后等当前一轮结束再退出。
+    单轮异常不会终止进程，记入状态文件后按退避间隔重试。
+    """
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"\n收到信号 {signum}，本轮结束后退出...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    schedule = AdaptiveInterval()
+    status = {
+        "pid": os.getpid(),
+        "started_at": int(time.time()),
+        "state": "running",
+        "runs": 0,
+        "failures": 0,
+        "last_run_at": None,
+        "last_ok": None,
+        "last_error": None,
+        "last_new_items": None,
+        "last_duration": None,
+        "velocity_per_min": None,
+        "interval": schedule.interval,
+        "next_run_at": int(time.time()),
+    }
+    write_status(status, status_path)
+    print(f"=== 常驻模式启动 (pid {status['pid']})，间隔 {schedule.min_interval:.0f}-{schedule.max_interval:.0f}s ===")
+
+    last_start = None
+    while not stop.is_set():
+        start = time.time()
+        status["runs"] += 1
+        status["last_run_at"] = int(start)
+        try:
+            new_items = run_once() or 0
+            elapsed = start - last_start if last_start else schedule.min_interval
+            interval = schedule.observe(new_items, elapsed, night=is_night())
+            status["last_ok"] = int(time.time())
+            status["last_new_items"] = new_items
+            status["last_error"] = None
+        except Exception as e:
+            traceback.print_exc()
+            interval = schedule.backoff()
+            status["failures"] += 1
+            status["last_error"] = f"{type(e).__name__}: {e}"
+        last_start = start
+        status["last_duration"] = round(time.time() - start, 2)
+        status["velocity_per_min"] = None if schedule.velocity is None else round(schedule.velocity, 3)
+        status["interval"] = round(interval, 1)
+        status["next_run_at"] = int(time.time() + interval)
+        write_status(status, status_path)
+        if max_runs and status["runs"] >= max_runs:
+            break
+        print(f"--- 第 {status['runs']} 轮完成，{interval:.0f}s 后进行下一轮 ---")
+        stop.wait(interval)
+
+    status["state"] = "stopped"
+    status["next_run_at"] = None
+    write_status(status, status_path)
+    print("常驻模式已退出。")
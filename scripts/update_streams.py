@@ -1,9 +1,14 @@
 import os
+import sys
 import json
 from googleapiclient.discovery import build
 import datetime
-import boto3
-from botocore.config import Config
+import time
+
+# 与新闻流水线共用 R2 上传逻辑（从仓库根目录运行）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from publish import get_r2_client, put_bytes, write_json_if_changed
+from metrics import get_metrics, record_run
 
 # -------------------------------------------------------------
 # Configuration
@@ -12,45 +17,6 @@ yt_token = os.environ.get("YOUTUBE_" + "API_KEY")
 CONFIG_FILE = "scripts/stream_config.json"
 OUTPUT_FILE = "public/live_data.json"
 
-# === R2 配置 ===
-R2_ACCOUNT_ID = os.environ.get("CLOUDFLARE_ACCOUNT_ID", "")
-R2_ACCESS_KEY = os.environ.get("CLOUDFLARE_R2_ACCESS_KEY_ID", "")
-R2_SECRET_KEY = os.environ.get("CLOUDFLARE_R2_SECRET_ACCESS_KEY", "")
-R2_BUCKET_NAME = os.environ.get("R2_BUCKET_NAME", "cnjp-data")
-
-def get_r2_client():
-    """获取 R2 客户端"""
-    if not R2_ACCOUNT_ID or not R2_ACCESS_KEY or not R2_SECRET_KEY:
-        print("⚠️ R2 credentials not configured, skipping R2 upload")
-        return None
-    
-    return boto3.client(
-        's3',
-        endpoint_url=f'https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com',
-        aws_access_key_id=R2_ACCESS_KEY,
-        aws_secret_access_key=R2_SECRET_KEY,
-        config=Config(signature_version='s3v4'),
-        region_name='auto'
-    )
-
-def upload_to_r2(client, local_path, r2_key):
-    """上传文件到 R2"""
-    if client is None:
-        return False
-    try:
-        with open(local_path, 'rb') as f:
-            client.put_object(
-                Bucket=R2_BUCKET_NAME,
-                Key=r2_key,
-                Body=f.read(),
-                ContentType='application/json'
-            )
-        print(f"✅ Uploaded to R2: {r2_key}")
-        return True
-    except Exception as e:
-        print(f"❌ R2 upload failed for {r2_key}: {e}")
-        return False
-
 def load_stream_config():
     """加载直播源配置"""
     with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
@@ -85,7 +51,11 @@ def get_live_stream_for_channel(youtube, channel_id, keywords, channel_name):
             type="video",
             maxResults=50
         )
-        response = request.execute()
+        request_start = time.monotonic()
+        try:
+            response = request.execute()
+        finally:
+            get_metrics().observe("youtube_search", time.monotonic() - request_start)
         items = response.get("items", [])
 
         if not items:
@@ -123,6 +93,7 @@ def get_live_stream_for_channel(youtube, channel_id, keywords, channel_name):
         }
         
     except Exception as e:
+        get_metrics().count("youtube_failures")
         print(f"   ❌ Error: {e}")
         return None
 
@@ -183,16 +154,15 @@ def update_all_streams(api_key):
 def save_to_json(data, filename):
     """保存数据到 JSON 文件并上传到 R2"""
     os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    _, body = write_json_if_changed(filename, data)
     
     print("\n" + "=" * 80)
     print(f"💾 Data saved to {filename}")
     
-    # 上传到 R2
-    r2_client = get_r2_client()
+    # 直接上传内存中的字节，不再读回文件
+    r2_client = get_r2_client(max_connections=1)
     if r2_client:
-        upload_to_r2(r2_client, filename, "live_data.json")
+        put_bytes(r2_client, body, "live_data.json")
     
     print("=" * 80)
     print("\n📊 Summary:")
@@ -207,9 +177,16 @@ if __name__ == "__main__":
     if not yt_token:
         raise ValueError("❌ Error: Missing YouTube API key!")
     
+    # 运行报告与 main.py / maintenance.py 格式相同（见 metrics.py）
     try:
-        data = update_all_streams(yt_token)
-        save_to_json(data, OUTPUT_FILE)
+        with record_run("update_streams") as metrics:
+            metrics.begin("fetch")
+            data = update_all_streams(yt_token)
+            live = sum(1 for stream in data["streams"] if stream["isLive"])
+            metrics.count("live", live, stage="fetch")
+            metrics.count("offline", len(data["streams"]) - live, stage="fetch")
+            metrics.begin("save")
+            save_to_json(data, OUTPUT_FILE)
         print("\n✨ Done.")
     except Exception as e:
         print(f"\n❌ Fatal error: {e}")
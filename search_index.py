@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import unicodedata
+from publish import write_json_if_changed
+
+# 全文检索倒排索引：先按月份、再按词项首字符分片，前端只下载查询词所在的分片，
+# 新条目只改动当月的分片（不会随存档变长而改写全部历史）
+#   search/manifest.json          {"version", "shard_count", "periods": {月份: {分片: 内容版本号}}}
+#   search/<yyyy-mm>/<nn>.json    {词项: {日期: [文档 ID, ...]}}
+# 文档 ID 为链接的 FNV-1a 32 位哈希（8 位十六进制），前端用同样的算法在 archive/<日期>.json 中定位条目
+SEARCH_DIR = "public/search"
+SEARCH_MANIFEST = os.path.join(SEARCH_DIR, "manifest.json")
+SEARCH_VERSION = 2
+# 每个月份内的分片数（一个月约两千条，分片过多只会增加前端请求数）
+SEARCH_SHARDS = int(os.environ.get("SEARCH_SHARDS", "16"))
+SEARCH_FIELDS = ("title", "title_tc", "title_ja", "origin")
+
+# 汉字 / 假名 / 谚文按二元组切分，拉丁字母和数字按整词
+_CJK_RUN = re.compile(r"[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]+")
+_WORD = re.compile(r"[0-9a-z]{2,}")
+
+def tokenize(text):
+    """NFKC 归一化、转小写后切出词项集合（与前端 src/lib/search.ts 保持一致）"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    terms = set(_WORD.findall(text))
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        else:
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+def item_terms(item):
+    terms = set()
+    for field in SEARCH_FIELDS:
+        terms |= tokenize(item.get(field))
+    return terms
+
+def doc_id(item):
+    """链接的 FNV-1a 32 位哈希"""
+    h = 0x811c9dc5
+    for byte in (item.get('link') or "").encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return f"{h:08x}"
+
+def shard_of(term):
+    """按词项首字符分片"""
+    return f"{ord(term[0]) % SEARCH_SHARDS:02x}"
+
+def period_of(date_str):
+    """日期所在的月份 yyyy-mm"""
+    return date_str[:7]
+
+def shard_key(period, shard):
+    return f"search/{period}/{shard}.json"
+
+def day_postings(items):
+    """{doc_id: 词项集合}；同一天里链接相同的条目（标题改过的转载）共用一个 ID，词项合并"""
+    docs = {}
+    for item in items:
+        docs.setdefault(doc_id(item), set()).update(item_terms(item))
+    return docs
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def has_search_index(search_dir=SEARCH_DIR):
+    """本地索引存在且格式、分片数与当前配置一致（否则需要重建）"""
+    manifest = load_json(os.path.join(search_dir, os.path.basename(SEARCH_MANIFEST)), {})
+    return manifest.get("version") == SEARCH_VERSION and manifest.get("shard_count") == SEARCH_SHARDS
+
+def update_search_index(day_changes, search_dir=SEARCH_DIR):
+    """
+    增量更新索引。day_changes: {date: (旧条目列表, 新条目列表)}。
+    逐篇文档比较新旧词项，只修改有变化的词项所在的（月份, 分片）。
+    返回需要发布的 [(本地路径, R2 key, 字节), ...]，manifest 排在最后；没有变化时返回空列表。
+    """
+    # {(月份, 分片): {term: {date: (要删除的 ID 集合, 要添加的 ID 集合)}}}
+    edits = {}
+    for date_str, (old_items, new_items) in day_changes.items():
+        period = period_of(date_str)
+        old_docs, new_docs = day_postings(old_items), day_postings(new_items)
+        for doc in old_docs.keys() | new_docs.keys():
+            old_terms, new_terms = old_docs.get(doc, set()), new_docs.get(doc, set())
+            for term in old_terms - new_terms:
+                edits.setdefault((period, shard_of(term)), {}).setdefault(term, {}) \
+                    .setdefault(date_str, (set(), set()))[0].add(doc)
+            for term in new_terms - old_terms:
+                edits.setdefault((period, shard_of(term)), {}).setdefault(term, {}) \
+                    .setdefault(date_str, (set(), set()))[1].add(doc)
+    if not edits:
+        return []
+
+    manifest_path = os.path.join(search_dir, os.path.basename(SEARCH_MANIFEST))
+    manifest = load_json(manifest_path, {})
+    if manifest.get("version") != SEARCH_VERSION:
+        manifest = {"periods": {}}
+    outputs = []
+    for (period, shard), term_edits in sorted(edits.items()):
+        path = os.path.join(search_dir, period, f"{shard}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        index = load_json(path, {})
+        for term, by_date in term_edits.items():
+            postings = index.setdefault(term, {})
+            for date_str, (removed, added) in by_date.items():
+                docs = (set(postings.get(date_str, [])) - removed) | added
+                if docs:
+                    postings[date_str] = sorted(docs)
+                else:
+                    postings.pop(date_str, None)
+            if not postings:
+                del index[term]
+            else:
+                index[term] = dict(sorted(postings.items()))
+        changed, body = write_json_if_changed(path, dict(sorted(index.items())))
+        if changed:
+            manifest["periods"].setdefault(period, {})[shard] = hashlib.md5(body).hexdigest()[:12]
+            outputs.append((path, shard_key(period, shard), body))
+
+    if not outputs:
+        return []
+    manifest["version"] = SEARCH_VERSION
+    manifest["shard_count"] = SEARCH_SHARDS
+    manifest["periods"] = {period: dict(sorted(shards.items()))
+                           for period, shards in sorted(manifest["periods"].items())}
+    _, body = write_json_if_changed(manifest_path, manifest)
+    outputs.append((manifest_path, "search/manifest.json", body))
+    periods = sorted({period for period, _ in edits})
+    print(f"检索索引更新：{len(day_changes)} 天，{len(periods)} 个月份，修改 {len(outputs) - 1} 个分片")
+    return outputs
+
+def rebuild_search_index(store=None, search_dir=SEARCH_DIR):
+    """清空后按全部存档重建索引"""
+    from archive_store import get_store
+
+    store = store or get_store()
+    if os.path.exists(search_dir):
+        shutil.rmtree(search_dir)
+    day_changes = {date_str: ([], store.load_day(date_str)) for date_str in store.dates()}
+    outputs = update_search_index(day_changes, search_dir)
+    total = sum(len(body) for _, _, body in outputs)
+    print(f"检索索引重建完成：{len(day_changes)} 天，{len(outputs) - 1} 个分片，共 {total / 1024:.1f} KB")
+    return outputs
+
+if __name__ == "__main__":
+    # python search_index.py            按全部存档重建索引
+    # python search_index.py 词 ...      在本地索引中检索（调试用）
+    if len(sys.argv) > 1:
+        terms = set()
+        for word in sys.argv[1:]:
+            terms |= tokenize(word)
+        periods = load_json(SEARCH_MANIFEST, {}).get("periods", {})
+        hits = None
+        for term in terms:
+            docs = set()
+            for period in periods:
+                postings = load_json(os.path.join(SEARCH_DIR, period, f"{shard_of(term)}.json"), {}).get(term, {})
+                docs |= {(d, doc) for d, ids in postings.items() for doc in ids}
+            hits = docs if hits is None else hits & docs
+        for date_str, doc in sorted(hits or [], reverse=True):
+            print(date_str, doc)
+    else:
+        rebuild_search_index()
@@ -16,11 +16,25 @@ import DisasterSection from "@/components/disaster/DisasterSection";
 import { Search, Loader2, X, Flame, ArrowUpDown, Calendar } from "lucide-react";
 import { useTheme } from "@/components/ThemeContext";
 import { CATEGORY_MAP, CATEGORIES } from "@/lib/constants";
+import { isIndexable, searchArchive } from "@/lib/search";
 import { motion, AnimatePresence } from "framer-motion";
 
 // R2 公开访问 URL
 const R2_PUBLIC_URL = process.env.NEXT_PUBLIC_R2_URL || "";
 
+function sortNews(items: NewsItem[], sortMode: 'publish' | 'fetch'): NewsItem[] {
+  return [...items].sort((a, b) => {
+    if (sortMode === 'fetch') {
+      // 按抓取时间排序（新抓取的在前）
+      const fetchA = (a as any).fetched_at || a.timestamp || 0;
+      const fetchB = (b as any).fetched_at || b.timestamp || 0;
+      return fetchB - fetchA;
+    }
+    // 按发布时间排序（默认）
+    return (b.timestamp || 0) - (a.timestamp || 0);
+  });
+}
+
 export default function Home() {
   const { settings } = useTheme();
   const [mounted, setMounted] = useState(false);
@@ -28,6 +42,7 @@ export default function Home() {
   // --- State ---
   const [rawNewsData, setRawNewsData] = useState<NewsItem[]>([]);
   const [allNewsData, setAllNewsData] = useState<NewsItem[]>([]); // 所有归档新闻
+  const [indexResults, setIndexResults] = useState<NewsItem[] | null>(null); // 检索索引命中的归档新闻
   const [lastUpdated, setLastUpdated] = useState("");
   const [favorites, setFavorites] = useState<NewsItem[]>([]);
   const [archiveData, setArchiveData] = useState<Record<string, NewsItem[]>>({});
@@ -51,6 +66,10 @@ export default function Home() {
 
   // UI State
   const [currentFilter, setCurrentFilter] = useState("all");
+  // 分片首页的 manifest 与已下载的分类分片（分类 key -> 新闻列表），版本变化时一起清空
+  const feedManifestRef = useRef<any>(null);
+  const currentFilterRef = useRef("all"); // 轮询刷新时的回调拿不到最新的 currentFilter
+  const [categoryNews, setCategoryNews] = useState<Record<string, NewsItem[]>>({});
   const [searchInput, setSearchInput] = useState("");
   const [searchQuery, setSearchQuery] = useState("");
   const [visibleCount, setVisibleCount] = useState(25);
@@ -96,11 +115,13 @@ export default function Home() {
   }, []);
 
   const getCategoryCount = useCallback((category: string) => {
+    // 分类分片已下载时以分片为准（续页可能还没下载完）
+    if (categoryNews[category]) return categoryNews[category].length;
     return rawNewsData.filter(item => {
       const cat = item.category ? (CATEGORY_MAP[item.category] || item.category) : '';
       return cat === category;
     }).length;
-  }, [rawNewsData]);
+  }, [rawNewsData, categoryNews]);
 
   // SECTION 1: Manual Trending Keywords
   const trendingNow = ["高市", "滨崎步", "台湾", "逮捕", "香港"];
@@ -231,24 +252,88 @@ export default function Home() {
     }
   }, []);
 
+  // 分片首页：先取 manifest 和首屏（最新几十条）立即渲染，续页在后台补齐
+  // 分片不可用时返回 false，由调用方回退到完整的 data.json
+  const loadShardedFeed = async (): Promise<boolean> => {
+    try {
+      const base = R2_PUBLIC_URL ? `${R2_PUBLIC_URL}/` : "/";
+      const rManifest = await fetch(`${base}feed/manifest.json?t=${Date.now()}`);
+      if (!rManifest.ok) return false;
+      const manifest = await rManifest.json();
+      // 分片地址用内容版本做缓存键
+      const shardUrl = (path: string) => `${base}${path}?v=${manifest.version}`;
+      if (feedManifestRef.current?.version !== manifest.version) {
+        feedManifestRef.current = manifest;
+        setCategoryNews({});
+        if (currentFilterRef.current !== "all") loadCategoryShard(currentFilterRef.current);
+      }
+
+      const rFirst = await fetch(shardUrl(manifest.first));
+      if (!rFirst.ok) return false;
+      const first = await rFirst.json();
+      setRawNewsData(first.news || []);
+      setLastUpdated(manifest.last_updated || "");
+      // 清除新内容提醒
+      setNewContentCount(0);
+      setPendingNewsData(null);
+      setPendingLastUpdated("");
+      setIsLoading(false);
+
+      const pages: string[] = manifest.pages || [];
+      if (pages.length > 0) {
+        const rest = await Promise.all(pages.map(async (page) => {
+          const r = await fetch(shardUrl(page));
+          if (!r.ok) throw new Error(`Failed to load ${page}`);
+          return (await r.json()).news || [];
+        }));
+        setRawNewsData([...(first.news || []), ...rest.flat()]);
+      }
+      return true;
+    } catch (e) {
+      console.error("Failed to load sharded feed", e);
+      return false;
+    }
+  };
+
+  // 分类分片：切换到某个分类时只下载该分类的全部条目，不必等续页补齐
+  const loadCategoryShard = async (category: string) => {
+    const manifest = feedManifestRef.current;
+    const shard = manifest?.categories?.[category];
+    if (!shard) return;
+    try {
+      const base = R2_PUBLIC_URL ? `${R2_PUBLIC_URL}/` : "/";
+      const r = await fetch(`${base}${shard.file}?v=${manifest.version}`);
+      if (!r.ok) return;
+      const news: NewsItem[] = (await r.json()).news || [];
+      // 下载期间首页已换版本时丢弃
+      if (feedManifestRef.current?.version !== manifest.version) return;
+      setCategoryNews(prev => ({ ...prev, [category]: news }));
+    } catch (e) {
+      console.error(`Failed to load category shard ${category}`, e);
+    }
+  };
+
   const fetchData = async (showLoading = true) => {
     if (showLoading) setIsLoading(true);
     try {
-      // 从 R2 获取最新新闻数据
-      const dataUrl = R2_PUBLIC_URL
-        ? `${R2_PUBLIC_URL}/data.json?t=${Date.now()}`
-        : `/data.json?t=${Date.now()}`;
-      const r = await fetch(dataUrl);
-      const data = await r.json();
-      if (data && data.news) {
-        setRawNewsData(data.news);
-        setLastUpdated(data.last_updated || "");
-        // 清除新内容提醒
-        setNewContentCount(0);
-        setPendingNewsData(null);
-        setPendingLastUpdated("");
-      } else if (Array.isArray(data)) {
-        setRawNewsData(data);
+      // 从 R2 获取最新新闻数据：优先分片首页，失败时回退完整 data.json
+      const loadedFromFeed = await loadShardedFeed();
+      if (!loadedFromFeed) {
+        const dataUrl = R2_PUBLIC_URL
+          ? `${R2_PUBLIC_URL}/data.json?t=${Date.now()}`
+          : `/data.json?t=${Date.now()}`;
+        const r = await fetch(dataUrl);
+        const data = await r.json();
+        if (data && data.news) {
+          setRawNewsData(data.news);
+          setLastUpdated(data.last_updated || "");
+          // 清除新内容提醒
+          setNewContentCount(0);
+          setPendingNewsData(null);
+          setPendingLastUpdated("");
+        } else if (Array.isArray(data)) {
+          setRawNewsData(data);
+        }
       }
 
       // 从 R2 获取归档索引
@@ -381,12 +466,30 @@ export default function Home() {
     };
   }, [checkForNewContent]);
 
-  // 当有搜索词且有归档索引时，加载全部数据
+  // 当有搜索词且有归档索引时，优先用检索分片只加载命中的归档；
+  // 索引不可用或查询词过短（单个汉字、单个字母）时，退回加载全部数据
+  const searchSeqRef = useRef(0);
   useEffect(() => {
-    if (searchQuery && Object.keys(archiveIndex).length > 0 && allNewsData.length === 0) {
+    if (!searchQuery || Object.keys(archiveIndex).length === 0) return;
+    const seq = ++searchSeqRef.current;
+    setIndexResults(null);
+    if (!isIndexable(searchQuery)) {
       loadAllArchiveData();
+      return;
     }
-  }, [searchQuery, archiveIndex, allNewsData.length]);
+    setIsSearchingAll(true);
+    searchArchive(searchQuery, 500)
+      .then(items => {
+        if (seq === searchSeqRef.current) setIndexResults(items);
+      })
+      .catch(e => {
+        console.error("Search index unavailable, loading all archives", e);
+        if (seq === searchSeqRef.current) loadAllArchiveData();
+      })
+      .finally(() => {
+        if (seq === searchSeqRef.current) setIsSearchingAll(false);
+      });
+  }, [searchQuery, archiveIndex]);
 
   // 加载新内容
   const loadNewContent = () => {
@@ -518,31 +621,32 @@ export default function Home() {
 
   // 选择数据源：搜索时用全部数据，否则用今天/昨天数据
   const dataSource = useMemo(() => {
+    if (searchQuery && indexResults) {
+      // 索引结果不含尚未归档的最新条目，与当前数据合并去重
+      const seen = new Set(indexResults.map(item => item.link));
+      return [...indexResults, ...rawNewsData.filter(item => !seen.has(item.link))];
+    }
     if (searchQuery && allNewsData.length > 0) {
       return allNewsData;
     }
     return rawNewsData;
-  }, [searchQuery, allNewsData, rawNewsData]);
+  }, [searchQuery, indexResults, allNewsData, rawNewsData]);
+
+  // 搜索范围的总条数（用索引检索时为全部归档的条数）
+  const searchPoolSize = indexResults
+    ? Object.values(archiveIndex).reduce((sum, n) => sum + n, 0)
+    : allNewsData.length || rawNewsData.length;
 
   // 排序后的新闻数据
-  const sortedNewsData = useMemo(() => {
-    const sorted = [...dataSource].sort((a, b) => {
-      if (sortMode === 'fetch') {
-        // 按抓取时间排序（新抓取的在前）
-        const fetchA = (a as any).fetched_at || a.timestamp || 0;
-        const fetchB = (b as any).fetched_at || b.timestamp || 0;
-        return fetchB - fetchA;
-      } else {
-        // 按发布时间排序（默认）
-        return (b.timestamp || 0) - (a.timestamp || 0);
-      }
-    });
-    return sorted;
-  }, [dataSource, sortMode]);
+  const sortedNewsData = useMemo(() => sortNews(dataSource, sortMode), [dataSource, sortMode]);
 
   const filteredItems = useMemo(() => {
     let filtered = sortedNewsData;
-    if (currentFilter !== "all") {
+    const shardNews = categoryNews[currentFilter];
+    if (currentFilter !== "all" && shardNews && dataSource === rawNewsData) {
+      // 首页（非全库检索）的分类视图直接用分类分片
+      filtered = sortNews(shardNews, sortMode);
+    } else if (currentFilter !== "all") {
       filtered = filtered.filter((item) => {
         const itemCategory = item.category || "其他";
         const itemCategoryKey = CATEGORY_MAP[itemCategory] || "other";
@@ -561,7 +665,7 @@ export default function Home() {
     }
 
     return filtered;
-  }, [sortedNewsData, currentFilter, searchQuery]);
+  }, [sortedNewsData, currentFilter, searchQuery, categoryNews, dataSource, rawNewsData, sortMode]);
 
   const displayItems = filteredItems.slice(0, visibleCount);
 
@@ -622,6 +726,8 @@ export default function Home() {
 
   const handleFilterChange = (cat: string) => {
     setCurrentFilter(cat);
+    currentFilterRef.current = cat;
+    if (cat !== "all" && !categoryNews[cat]) loadCategoryShard(cat);
     setVisibleCount(25);
     window.scrollTo({ top: 0, behavior: "smooth" });
   };
@@ -904,8 +1010,8 @@ export default function Home() {
                   ) : (
                     <span>
                       {settings.lang === "sc"
-                        ? `在 ${allNewsData.length || rawNewsData.length} 条新闻中找到 ${filteredItems.length} 条结果`
-                        : `在 ${allNewsData.length || rawNewsData.length} 條新聞中找到 ${filteredItems.length} 條結果`}
+                        ? `在 ${searchPoolSize} 条新闻中找到 ${filteredItems.length} 条结果`
+                        : `在 ${searchPoolSize} 條新聞中找到 ${filteredItems.length} 條結果`}
                     </span>
                   )}
                 </div>
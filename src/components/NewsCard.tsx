@@ -8,6 +8,18 @@ import Modal from "./Modal";
 import { CATEGORY_MAP, CATEGORY_DOT_COLORS } from "@/lib/constants";
 import { Heart, ExternalLink, Tag } from "lucide-react";
 
+const R2_PUBLIC_URL = process.env.NEXT_PUBLIC_R2_URL || "";
+
+// logo 为相对路径时是镜像到 R2 的 logos/<域名>.png；加载失败时回退到 favicon 服务
+function resolveLogo(logo: string): string {
+    return /^https?:\/\//.test(logo) ? logo : `${R2_PUBLIC_URL}/${logo}`;
+}
+
+function fallbackLogo(logo: string): string | null {
+    const match = logo.match(/^logos\/(.+)\.png$/);
+    return match ? `https://www.google.com/s2/favicons?domain=${match[1]}&sz=128` : null;
+}
+
 export interface NewsItem {
     title: string;
     title_tc?: string;
@@ -104,10 +116,17 @@ export default function NewsCard({
                         <div className="flex items-center gap-1.5">
                             {item.logo && (
                                 <img
-                                    src={item.logo}
+                                    src={resolveLogo(item.logo)}
                                     alt="logo"
                                     className="w-3 h-3 object-contain opacity-60 grayscale"
-                                    onError={(e) => e.currentTarget.style.display = 'none'}
+                                    onError={(e) => {
+                                        const fallback = fallbackLogo(item.logo || "");
+                                        if (fallback && e.currentTarget.src !== fallback) {
+                                            e.currentTarget.src = fallback;
+                                        } else {
+                                            e.currentTarget.style.display = 'none';
+                                        }
+                                    }}
                                 />
                             )}
                             <span className="text-[var(--text-aux)] font-medium tracking-wide">
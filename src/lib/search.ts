@@ -0,0 +1,146 @@
+import type { NewsItem } from "@/components/NewsCard";
+
+// 存档全文检索：读取 search_index.py 生成的分片倒排索引（按月份 + 词项首字符分片）
+// 从最近的月份开始只下载查询词所在的分片，再按命中的日期读取 archive/<日期>.json 还原条目，凑够条数即停止
+const R2_PUBLIC_URL = process.env.NEXT_PUBLIC_R2_URL || "";
+
+interface SearchManifest {
+    version: number;
+    shard_count: number;
+    periods: Record<string, Record<string, string>>; // 月份 -> 分片 ID -> 内容版本号
+}
+
+// 每次并行检索的月份数
+const PERIOD_BATCH = 6;
+
+type Shard = Record<string, Record<string, string[]>>; // 词项 -> 日期 -> 文档 ID 列表
+
+// 与 search_index.py 的 _CJK_RUN / _WORD 保持一致
+const CJK_RUN = /[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]+/g;
+const WORD = /[0-9a-z]{2,}/g;
+
+export function tokenize(text: string): string[] {
+    const normalized = (text || "").normalize("NFKC").toLowerCase();
+    const terms = new Set<string>(normalized.match(WORD) || []);
+    for (const run of normalized.match(CJK_RUN) || []) {
+        if (run.length === 1) {
+            terms.add(run);
+        } else {
+            for (let i = 0; i < run.length - 1; i++) terms.add(run.slice(i, i + 2));
+        }
+    }
+    return Array.from(terms);
+}
+
+// 所有词项都能在索引中查到（单个汉字、单个字母不入索引，需退回全量匹配）
+export function isIndexable(query: string): boolean {
+    const terms = tokenize(query);
+    return terms.length > 0 && terms.every(term => term.length >= 2);
+}
+
+// 链接的 FNV-1a 32 位哈希，与 search_index.doc_id 相同
+export function docId(link: string): string {
+    let h = 0x811c9dc5;
+    for (const byte of new TextEncoder().encode(link || "")) {
+        h = Math.imul(h ^ byte, 0x01000193) >>> 0;
+    }
+    return h.toString(16).padStart(8, "0");
+}
+
+function shardOf(term: string, shardCount: number): string {
+    return ((term.codePointAt(0) || 0) % shardCount).toString(16).padStart(2, "0");
+}
+
+let manifestPromise: Promise<SearchManifest> | null = null;
+const shardCache = new Map<string, Promise<Shard>>();
+const dayCache = new Map<string, Promise<NewsItem[]>>();
+
+function loadManifest(): Promise<SearchManifest> {
+    if (!manifestPromise) {
+        manifestPromise = fetch(`${R2_PUBLIC_URL}/search/manifest.json?t=${Date.now()}`)
+            .then(res => res.json())
+            .catch(err => {
+                manifestPromise = null;
+                throw err;
+            });
+    }
+    return manifestPromise;
+}
+
+function loadShard(period: string, id: string, version: string): Promise<Shard> {
+    const key = `${period}/${id}:${version}`;
+    if (!shardCache.has(key)) {
+        // 版本号随内容变化，分片本身可以长期缓存
+        shardCache.set(key, fetch(`${R2_PUBLIC_URL}/search/${period}/${id}.json?v=${version}`)
+            .then(res => (res.ok ? res.json() : {}))
+            .catch(() => ({})));
+    }
+    return shardCache.get(key)!;
+}
+
+function loadDay(date: string): Promise<NewsItem[]> {
+    if (!dayCache.has(date)) {
+        dayCache.set(date, fetch(`${R2_PUBLIC_URL}/archive/${date}.json`)
+            .then(res => (res.ok ? res.json() : []))
+            .catch(() => []));
+    }
+    return dayCache.get(date)!;
+}
+
+// 一个月份内所有词项都命中的 日期 -> 文档 ID 集合
+async function searchPeriod(manifest: SearchManifest, period: string, terms: string[]): Promise<Map<string, Set<string>>> {
+    const versions = manifest.periods[period] || {};
+    const shardIds = Array.from(new Set(terms.map(t => shardOf(t, manifest.shard_count))));
+    if (shardIds.some(id => !versions[id])) return new Map();
+    const shards = new Map<string, Shard>();
+    await Promise.all(shardIds.map(async id => {
+        shards.set(id, await loadShard(period, id, versions[id]));
+    }));
+
+    // 各词项的 日期 -> 文档 ID 集合 求交集
+    let hits: Map<string, Set<string>> | null = null;
+    for (const term of terms) {
+        const postings = shards.get(shardOf(term, manifest.shard_count))?.[term] || {};
+        const next = new Map<string, Set<string>>();
+        for (const [date, ids] of Object.entries(postings)) {
+            const prev: Set<string> | undefined = hits ? hits.get(date) : undefined;
+            const kept = prev ? ids.filter(id => prev.has(id)) : hits ? [] : ids;
+            if (kept.length > 0) next.set(date, new Set(kept));
+        }
+        hits = next;
+        if (hits.size === 0) break;
+    }
+    return hits || new Map();
+}
+
+/**
+ * 在全部存档中检索，所有词项都命中的条目按时间倒序返回。
+ * 从最近的月份往前逐批检索，凑够 limit 条即停止，较早月份的分片不会被下载。
+ * 索引中残留的已删除条目在日存档里找不到，会被自然忽略。
+ */
+export async function searchArchive(query: string, limit = 50): Promise<NewsItem[]> {
+    const terms = tokenize(query);
+    if (terms.length === 0) return [];
+
+    const manifest = await loadManifest();
+    const periods = Object.keys(manifest.periods || {}).sort().reverse();
+    const results: NewsItem[] = [];
+    for (let i = 0; i < periods.length && results.length < limit; i += PERIOD_BATCH) {
+        const batch = periods.slice(i, i + PERIOD_BATCH);
+        const batchHits = await Promise.all(batch.map(period => searchPeriod(manifest, period, terms)));
+        for (const hits of batchHits) {
+            // 从最近的日期开始读取日存档
+            const dates = Array.from(hits.keys()).sort().reverse();
+            for (const date of dates) {
+                const ids = hits.get(date)!;
+                const items = await loadDay(date);
+                for (const item of items) {
+                    if (ids.has(docId(item.link))) results.push(item);
+                }
+                if (results.length >= limit) break;
+            }
+            if (results.length >= limit) break;
+        }
+    }
+    return results.slice(0, limit);
+}
@@ -0,0 +1,257 @@
+import hashlib
+import os
+import threading
+import time
+from common import CACHE_DIR, JsonDiskCache, get_pool
+from metrics import get_metrics
+
+# === 翻译并发配置 (可通过环境变量调整) ===
+TRANSLATE_WORKERS = int(os.environ.get("TRANSLATE_WORKERS", "4"))
+# 令牌桶：每秒补充的请求数 & 桶容量（允许的瞬时突发）
+TRANSLATE_RATE = float(os.environ.get("TRANSLATE_RATE", "5"))
+TRANSLATE_BURST = int(os.environ.get("TRANSLATE_BURST", "10"))
+
+# 批量模式：把多条标题用换行拼成一次请求（接口单次上限 5000 字符）
+TRANSLATE_BATCH = os.environ.get("TRANSLATE_BATCH", "1") != "0"
+BATCH_MAX_CHARS = int(os.environ.get("TRANSLATE_BATCH_MAX_CHARS", "4500"))
+BATCH_MAX_ITEMS = int(os.environ.get("TRANSLATE_BATCH_MAX_ITEMS", "50"))
+BATCH_DELIMITER = "\n"
+
+SOURCE_LANG = "ja"
+TARGET_LANGS = ("zh-CN", "zh-TW")
+
+# === 翻译缓存配置 ===
+TRANSLATION_CACHE_FILE = os.path.join(CACHE_DIR, "translations.json")
+CACHE_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_AGE_DAYS = int(os.environ.get("TRANSLATION_CACHE_MAX_AGE_DAYS", "30"))
+
+
+class TokenBucket:
+    """令牌桶限流器，多线程共享"""
+
+    def __init__(self, rate, capacity):
+        self.rate = max(rate, 0.001)
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不够时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class TranslationCache(JsonDiskCache):
+    """
+    磁盘翻译缓存，键为 (原文哈希, 目标语言)，值为 [译文, 最后使用时间]。
+    文件里另存跨运行累计的命中统计。
+    """
+
+    label = "翻译缓存"
+
+    def __init__(self, path=TRANSLATION_CACHE_FILE, max_entries=CACHE_MAX_ENTRIES,
+                 max_age_days=CACHE_MAX_AGE_DAYS):
+        # 累计命中统计（跨运行保存）；本次运行的统计为 hits / misses
+        self.totals = {"hits": 0, "misses": 0}
+        super().__init__(path, max_entries, max_age_days)
+
+    @staticmethod
+    def make_key(text, target):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return f"{digest}:{target}"
+
+    def from_json(self, data):
+        self.entries = data.get("entries", {})
+        self.totals.update(data.get("stats", {}))
+
+    def to_json(self):
+        return {"stats": self.totals, "entries": self.entries}
+
+    def entry_time(self, entry):
+        return entry[1]
+
+    def get(self, text, target):
+        entry = self.entries.get(self.make_key(text, target))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry[1] = int(time.time())
+        self.dirty = True
+        return entry[0]
+
+    def put(self, text, target, translation):
+        self.entries[self.make_key(text, target)] = [translation, int(time.time())]
+        self.dirty = True
+
+    def save(self):
+        # 本次的命中统计并入累计值，只有统计变化时也要写
+        if self.hits or self.misses:
+            self.totals["hits"] += self.hits
+            self.totals["misses"] += self.misses
+            self.hits = self.misses = 0
+            self.dirty = True
+        super().save()
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        print(f"翻译缓存：命中 {self.hits}，未命中 {self.misses} (命中率 {rate:.0f}%)，"
+              f"缓存共 {len(self.entries)} 条")
+
+
+_cache = None
+
+def get_translation_cache():
+    """进程内共享的翻译缓存实例"""
+    global _cache
+    if _cache is None:
+        _cache = TranslationCache()
+    return _cache
+
+
+# GoogleTranslator 实例内部有可变状态，每个线程各自持有一份；deep_translator 在首次翻译时才导入
+GoogleTranslator = None
+_local = threading.local()
+
+def _get_translator(target):
+    global GoogleTranslator
+    if GoogleTranslator is None:
+        from deep_translator import GoogleTranslator
+    translators = getattr(_local, "translators", None)
+    if translators is None:
+        translators = _local.translators = {}
+    if target not in translators:
+        translators[target] = GoogleTranslator(source=SOURCE_LANG, target=target)
+    return translators[target]
+
+def make_batches(texts, max_chars=BATCH_MAX_CHARS, max_items=BATCH_MAX_ITEMS):
+    """按字符上限把原文打包成若干批；自身含分隔符或超长的原文单独成批"""
+    batches = []
+    current = []
+    size = 0
+    for text in texts:
+        if BATCH_DELIMITER in text or len(text) >= max_chars:
+            batches.append([text])
+            continue
+        extra = len(text) + (len(BATCH_DELIMITER) if current else 0)
+        if current and (size + extra > max_chars or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            size = 0
+            extra = len(text)
+        current.append(text)
+        size += extra
+    if current:
+        batches.append(current)
+    return batches
+
+def translate_titles(titles, targets=TARGET_LANGS, workers=None, rate=None, burst=None,
+                     cache=None, batch=None):
+    """
+    并发翻译一组标题，每个目标语言并行进行。先查翻译缓存，只有未命中的去请求翻译接口。
+    批量模式下多条标题合并为一次请求，译文行数对不上时该批回退为逐条请求。
+    返回 {target: [译文, ...]}，顺序与输入一致；单条失败时回退为原文（失败结果不写入缓存）。
+    """
+    workers = workers or TRANSLATE_WORKERS
+    bucket = TokenBucket(rate or TRANSLATE_RATE, burst or TRANSLATE_BURST)
+    cache = cache or get_translation_cache()
+    batch = TRANSLATE_BATCH if batch is None else batch
+    metrics = get_metrics()
+
+    results = {target: [None] * len(titles) for target in targets}
+    pending = {}  # (target, text) -> [下标, ...]，同一原文只请求一次
+    for target in targets:
+        for i, text in enumerate(titles):
+            if (target, text) in pending:
+                pending[(target, text)].append(i)
+                continue
+            cached = cache.get(text, target) if text else text
+            if cached is not None:
+                results[target][i] = cached
+            else:
+                pending[(target, text)] = [i]
+
+    request_count = 0
+    fallback_count = 0
+    counter_lock = threading.Lock()
+
+    def request(target, text):
+        nonlocal request_count
+        bucket.acquire()
+        with counter_lock:
+            request_count += 1
+        # 延迟只计接口调用本身，不含限流等待
+        request_start = time.monotonic()
+        try:
+            return _get_translator(target).translate(text)
+        finally:
+            metrics.observe("translate_request", time.monotonic() - request_start)
+
+    def translate_one(target, text):
+        try:
+            translation = request(target, text)
+            if translation:
+                cache.put(text, target, translation)
+                return translation
+        except Exception as e:
+            print(f"翻译失败 [{target}]: {e}")
+        return text
+
+    def work(job):
+        nonlocal fallback_count
+        target, texts = job
+        if len(texts) > 1:
+            try:
+                joined = request(target, BATCH_DELIMITER.join(texts)) or ""
+                parts = [part.strip() for part in joined.split(BATCH_DELIMITER)]
+                if len(parts) == len(texts) and all(parts):
+                    for text, translation in zip(texts, parts):
+                        cache.put(text, target, translation)
+                    return parts
+            except Exception as e:
+                print(f"批量翻译失败 [{target}]: {e}")
+            with counter_lock:
+                fallback_count += 1
+        return [translate_one(target, text) for text in texts]
+
+    jobs = []
+    for target in targets:
+        texts = [text for (t, text) in pending if t == target]
+        if batch:
+            jobs.extend((target, chunk) for chunk in make_batches(texts))
+        else:
+            jobs.extend((target, [text]) for text in texts)
+
+    start = time.monotonic()
+    # pool.map 按提交顺序返回结果，保证输出顺序确定
+    outputs = list(get_pool("translate", workers).map(work, jobs))
+    elapsed = time.monotonic() - start
+
+    for (target, texts), translations in zip(jobs, outputs):
+        for text, translation in zip(texts, translations):
+            for i in pending[(target, text)]:
+                results[target][i] = translation
+
+    metrics.count("translate_cache_hits", cache.hits)
+    metrics.count("translate_cache_misses", cache.misses)
+    metrics.count("translate_requests", request_count)
+    metrics.count("translate_batch_fallbacks", fallback_count)
+    if titles:
+        cache.report()
+    cache.save()
+    if pending:
+        print(f"翻译完成：{len(pending)} 条待译，{request_count} 次请求"
+              f"{f' ({fallback_count} 批回退逐条)' if fallback_count else ''}，"
+              f"耗时 {elapsed:.1f}s，吞吐 {len(pending) / max(elapsed, 1e-6):.1f} 条/秒 "
+              f"(并发 {workers}，限速 {bucket.rate:g}/s)")
+    return results
@@ -0,0 +1,91 @@
+import os
+import re
+import sys
+
+# === 繁体标题生成方式 ===
+# local: 由简体译文本地转换 (OpenCC 词库，无网络请求)
+# network: 日文原文再请求一次 zh-TW 翻译（旧方式）
+TC_MODE = os.environ.get("TC_MODE", "local")
+
+# OpenCC s2twp = 简体 -> 台湾正体，含台湾常用词汇短语转换
+OPENCC_CONFIG = "s2twp"
+
+# 本站补充词表（简体 -> 繁体），优先于 OpenCC 词库，贴近原先 Google zh-TW 的新闻用语
+# 最长匹配：命中的短语直接替换，其余片段交给 OpenCC
+PHRASE_TABLE = {
+    "台湾": "台灣",
+    "台海": "台海",
+    "台北": "台北",
+    "台南": "台南",
+    "消息": "消息",
+    "支持": "支持",
+    "项目": "項目",
+    "一个": "一個",
+    "宣布": "宣布",
+    "发布": "發布",
+    "在线": "在線",
+    "制造": "製造",
+    "人工智能": "人工智能",
+}
+_PHRASE_PATTERN = re.compile(
+    "(" + "|".join(re.escape(k) for k in sorted(PHRASE_TABLE, key=len, reverse=True)) + ")"
+)
+
+_converter = None
+
+def get_converter():
+    """懒加载 OpenCC 转换器；未安装时返回 None"""
+    global _converter
+    if _converter is None:
+        try:
+            from opencc import OpenCC
+        except ImportError:
+            print("⚠️ 未安装 opencc，无法本地转换繁体")
+            return None
+        _converter = OpenCC(OPENCC_CONFIG)
+    return _converter
+
+def to_traditional(text):
+    """简体 -> 繁体（本地转换）；转换器不可用时返回 None"""
+    if not text:
+        return text
+    converter = get_converter()
+    if converter is None:
+        return None
+    parts = _PHRASE_PATTERN.split(text)
+    # re.split 带捕获组：奇数位是命中的短语
+    return "".join(
+        PHRASE_TABLE[part] if i % 2 else converter.convert(part)
+        for i, part in enumerate(parts) if part
+    )
+
+def use_local_tc():
+    """本次运行是否走本地繁体转换"""
+    return TC_MODE == "local" and get_converter() is not None
+
+def convert_items(items):
+    """按简体标题重新生成 title_tc，返回有变动的条数"""
+    changed = 0
+    for item in items:
+        title = item.get('title')
+        if not title:
+            continue
+        title_tc = to_traditional(title)
+        if title_tc and item.get('title_tc') != title_tc:
+            item['title_tc'] = title_tc
+            changed += 1
+    return changed
+
+def convert_archive(dry_run=False, force=False):
+    """
+    批量模式：离线重建整个存档的 title_tc，不发任何翻译请求。
+    经存档流水线写回（archive_meta、首页与分类分片、检索索引随之更新）
+    """
+    if get_converter() is None:
+        return None
+    from archive_pipeline import run_pipeline
+    import migrate_tc  # 注册 tc_convert 变换
+    return run_pipeline(["tc_convert"], dry_run=dry_run, force=force)
+
+if __name__ == "__main__":
+    convert_archive(dry_run="--dry-run" in sys.argv, force="--force" in sys.argv)